@@ -1,60 +1,141 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, abort, jsonify
-from flask_bootstrap import Bootstrap # type: ignore
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, send_file, send_from_directory, abort, jsonify, g, session
+from werkzeug.exceptions import NotFound
+from contextlib import contextmanager
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 from bans import Ban, BanScraper, BanDatabase
-import sqlite3
+from names import NameIndex, name_key
+from durations import report_epoch, report_expiry, ban_status, format_timestamp, load_timezone
+from evidence import store_evidence, fetch_evidence
+from evidenceindex import MISSING_FILE_CLAUSE, index_evidence, indexed_folder, missing_file_locations, normalize_location, suggest_evidence
+from reasons import OTHER_REASON, form_reasons, store_reasons, fetch_reasons, listed_reasons
+from jobs import JobCancelled, JobManager, JobStore
+from configfile import ConfigFile
+from locks import FileLock
+from reportstats import read_report_stats
+from responsecache import ResponseCache
+from metrics import REQUEST_SECONDS, Gauge, render_metrics
+from database import LEGACY_BAN_SITE, REPORT_MIGRATIONS, migrate, schema_current, get_pool, day_range, month_range, keyset_clause, has_table, fts_query
+import database
+import durations
+import base64
+import cProfile
 import io
 import os
 import csv
+import functools
 import json
-import re
+import threading
+import time
+import zlib
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
-Bootstrap(app)
 CONFIG_FILE = 'config.json'
 DATABASE = 'reports.db'
 BANDATABASEFILE = 'bans.db'
-BAN_DATABASE = BanDatabase(BANDATABASEFILE)
-BANS_URL = "https://garnetgaming.net/darkrp/bans"
-is_scraping_bans = False
-
-def read_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as file:
-            return json.load(file)
-    else:
-        return {}
-
-config = read_config()
-UPLOAD_FOLDER = config.get('UPLOAD_FOLDER', 'E:\\Garnet-Reports')
+JOBS_DATABASE = 'jobs.db'
+DEFAULT_UPLOAD_FOLDER = 'E:\\Garnet-Reports'
+REPORT_POOL = get_pool(DATABASE)
+BAN_DATABASE = BanDatabase(BANDATABASEFILE, create=False)
+NAME_INDEX = NameIndex()
+# Held while the autocomplete index is being rebuilt from the databases
+NAME_INDEX_REBUILD = threading.Lock()
+# Guards name_index_version and name_index_writers
+NAME_INDEX_WRITES = threading.Lock()
+JOBS = JobManager(JobStore(JOBS_DATABASE))
+CONFIG = ConfigFile(CONFIG_FILE)
+RESPONSE_CACHE = ResponseCache(app.config['RESPONSE_CACHE_MAX_BYTES'], app.config['RESPONSE_CACHE_MAX_AGE'])
+# cProfile can only profile one request at a time
+PROFILE_LOCK = threading.Lock()
+database.slow_query_ms = app.config['SLOW_QUERY_MS']
+durations.ban_site_timezone = load_timezone(app.config['BAN_SITE_TIMEZONE'])
+PAGE_SIZE = 50
+EXPIRING_SOON_DAYS = 3
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_ROWS = 1000
+# How often autocomplete checks for report and ban commits its index hasn't seen
+NAME_INDEX_CHECK_SECONDS = 2
+REPORT_SORT_COLUMNS = ['date_time', 'reporter', 'reportee', 'report_reason', 'punishment']
+BAN_SORT_COLUMNS = ['date', 'player_name', 'admin_name', 'reason']
+REPORT_API_FIELDS = ['id', 'date_time', 'date_time_epoch', 'reporter', 'reportee', 'report_reason', 'evidence', 'punishment', 'expires_at', 'ban_status']
+BAN_API_FIELDS = ['id', 'date', 'date_epoch', 'player_name', 'player_steam_id', 'admin_name', 'admin_steam_id', 'length', 'reason', 'evidence', 'expires_at', 'site']
+# FTS5 matches joined onto the base table; -rank so that higher relevance sorts DESC like every other column
+REPORT_FTS_SOURCE = "report JOIN (SELECT rowid AS match_id, -rank AS relevance FROM report_fts WHERE report_fts MATCH ?) AS matches ON matches.match_id = report.id"
+BAN_FTS_SOURCE = "bans JOIN (SELECT rowid AS match_id, -rank AS relevance FROM bans_fts WHERE bans_fts MATCH ?) AS matches ON matches.match_id = bans.id"
+
+def ban_sites():
+    # Ban list URLs scraped into bans.db, saved in Settings
+    return CONFIG.get('BAN_SITES') or [LEGACY_BAN_SITE]
+
+def saved_steam_id():
+    try:
+        with open('steam_id.txt', 'r') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return ''
 
-def write_config(config):
-    with open(CONFIG_FILE, 'w') as file:
-        json.dump(config, file, indent=4)
+def upload_folder():
+    # Read through CONFIG on each use so a folder saved in one worker process applies in all of them
+    return CONFIG.get('UPLOAD_FOLDER', DEFAULT_UPLOAD_FOLDER)
 
 def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    if 'db' not in g:
+        g.db = REPORT_POOL.acquire()
+    return g.db
 
 def get_ban_db():
-    conn = sqlite3.connect(BANDATABASEFILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(bans)")
-    columns = [column[1] for column in cursor.fetchall()]
-
-    if 'evidence' not in columns:
-        cursor.execute("ALTER TABLE bans ADD COLUMN evidence TEXT")
-                    
-    conn.commit()
-    return conn
+    if 'ban_db' not in g:
+        g.ban_db = BAN_DATABASE.pool.acquire()
+    return g.ban_db
+
+@app.teardown_appcontext
+def release_db(exception):
+    db = g.pop('db', None)
+    if db is not None:
+        REPORT_POOL.release(db)
+    ban_db = g.pop('ban_db', None)
+    if ban_db is not None:
+        BAN_DATABASE.pool.release(ban_db)
+
+def get_page_size():
+    page_size = request.args.get('page_size', PAGE_SIZE, type=int)
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def encode_cursor(after, after_id):
+    return base64.urlsafe_b64encode(json.dumps([after, after_id]).encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    # Cursors are opaque to clients: the sort value and id of the last row on the previous page
+    if not token:
+        return None, None
+    try:
+        after, after_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise FilterError('Invalid cursor.')
+    if not isinstance(after_id, int):
+        raise FilterError('Invalid cursor.')
+    return after, after_id
+
+def parse_search_range(search_query):
+    for date_format, to_range in (('%Y-%m-%d', day_range), ('%Y-%m', month_range)):
+        try:
+            return to_range(datetime.strptime(search_query, date_format))
+        except ValueError:
+            pass
+    return None
+
+def default_month(args):
+    # Deep storage opens on the previous month, the normal view on the current one
+    current_month = datetime.now().strftime('%Y-%m')
+    previous_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    return args.get('selected_month', previous_month if args.get('deep_storage') == 'true' else current_month)
 
 def init_db():
-    with app.app_context():
-        db = get_db()
+    with REPORT_POOL.connection() as db:
+        # An up-to-date user_version means the schema and every migration are already in place
+        if schema_current(db, REPORT_MIGRATIONS):
+            return
         cursor = db.cursor()
         cursor.execute("""
             SELECT name FROM sqlite_master WHERE type='table' AND name='report';
@@ -63,98 +144,273 @@ def init_db():
             with app.open_resource('schema.sql', mode='r') as f:
                 db.executescript(f.read())
             db.commit()
-        db.close()
-
-if not os.path.exists(DATABASE):
-    init_db()
+        migrate(db, REPORT_MIGRATIONS)
+
+name_index_version = None
+name_index_checked = 0
+# Writes this process has in progress; their commits aren't mistaken for another worker's
+name_index_writers = 0
+
+def name_data_version():
+    return (REPORT_POOL.data_version(), BAN_DATABASE.pool.data_version())
+
+def load_name_index():
+    global name_index_version
+    # Read before the rows, so a commit made while they load still triggers the next rebuild
+    version = name_data_version()
+    rows = []
+    with REPORT_POOL.connection() as conn:
+        for reporter, reportee, date_time in conn.execute('SELECT reporter, reportee, date_time FROM report'):
+            rows.append((reporter, date_time))
+            rows.append((reportee, date_time))
+    with BAN_DATABASE.pool.connection() as conn:
+        for player_name, admin_name, date in conn.execute('SELECT player_name, admin_name, date FROM bans'):
+            rows.append((player_name, date))
+            rows.append((admin_name, date))
+    NAME_INDEX.load(rows)
+    with NAME_INDEX_WRITES:
+        name_index_version = version
+
+def rebuild_name_index():
+    try:
+        load_name_index()
+    finally:
+        NAME_INDEX_REBUILD.release()
+
+@contextmanager
+def writing_names(record=True):
+    # This process's own commits move data_version as well. Saves update the index in place, so with
+    # record=True the version after the save is taken as seen, unless a change from another worker was
+    # already pending before it. Scrapes and imports pass record=False: checks wait until they finish
+    # and then rebuild once.
+    global name_index_version, name_index_writers
+    before = name_data_version()
+    with NAME_INDEX_WRITES:
+        name_index_writers += 1
+    try:
+        yield
+    finally:
+        after = name_data_version() if record else None
+        with NAME_INDEX_WRITES:
+            name_index_writers -= 1
+            if record and before == name_index_version:
+                name_index_version = after
+
+def refresh_name_index():
+    # Other worker processes add, edit and delete reports and bans too. Their commits change data_version,
+    # the same signal the response cache uses, and the index is rebuilt in the background when it moves.
+    global name_index_checked
+    now = time.monotonic()
+    if not NAME_INDEX.loaded.is_set() or name_index_writers or now - name_index_checked < NAME_INDEX_CHECK_SECONDS:
+        return
+    name_index_checked = now
+    if name_data_version() != name_index_version and NAME_INDEX_REBUILD.acquire(blocking=False):
+        threading.Thread(target=rebuild_name_index, daemon=True).start()
+
+def add_ban_names(bans):
+    for ban in bans:
+        NAME_INDEX.add(ban.player_name, ban.date)
+        NAME_INDEX.add(ban.admin_name, ban.date)
+
+_started = False
+_start_lock = threading.Lock()
+
+def create_app():
+    # One-time startup for this process: schema and migrations, then the autocomplete index in the
+    # background. Importing app does no database work, so every entry point calls this:
+    # `python app.py`, serve.py and WSGI servers (gunicorn 'app:create_app()').
+    global _started
+    with _start_lock:
+        if not _started:
+            # Workers starting together take turns, so each migration runs once
+            with FileLock(DATABASE + '.migrate.lock'):
+                init_db()
+                BAN_DATABASE.create_table()
+                JOBS.store.create_table()
+            threading.Thread(target=load_name_index, daemon=True).start()
+            if app.config['EVIDENCE_INDEX_SECONDS'] > 0:
+                threading.Thread(target=evidence_index_loop, daemon=True).start()
+            _started = True
+    return app
+
+Gauge('response_cache_entries', 'Pages held in the response cache.', lambda: RESPONSE_CACHE.stats()['entries'])
+Gauge('response_cache_bytes', 'Bytes held in the response cache.', lambda: RESPONSE_CACHE.stats()['bytes'])
+Gauge('response_cache_lookups_total', 'Response cache lookups by result.',
+      lambda: {('hit',): RESPONSE_CACHE.stats()['hits'], ('miss',): RESPONSE_CACHE.stats()['misses']}, ['result'], 'counter')
+Gauge('db_pool_idle_connections', 'Idle pooled SQLite connections.',
+      lambda: {('reports.db',): REPORT_POOL.idle.qsize(), ('bans.db',): BAN_DATABASE.pool.idle.qsize()}, ['database'])
+
+def wants_profile():
+    return app.config['PROFILE_DIR'] and (request.args.get('profile') == '1' or request.headers.get('X-Profile'))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if wants_profile() and PROFILE_LOCK.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request_time(response):
+    # Registered before the other after_request hooks, so it runs last and includes them.
+    # Streamed responses (CSV exports) are timed up to the first byte.
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        PROFILE_LOCK.release()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{request.endpoint or 'unmatched'}.prof"
+        profiler.dump_stats(os.path.join(app.config['PROFILE_DIR'], name))
+        response.headers['X-Profile-File'] = name
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, response.status_code)
+    return response
+
+@app.teardown_request
+def stop_profiler(exception):
+    # after_request is skipped when the view raises; don't leave the profiler running or the lock held
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        PROFILE_LOCK.release()
+
+@app.route('/healthz')
+def healthz():
+    # Answered once the databases are initialised and the server is accepting requests; Electron polls it
+    return jsonify({'status': 'ok', 'name_index_loaded': NAME_INDEX.loaded.is_set()})
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/slow_queries')
+def slow_queries():
+    return jsonify(list(reversed(database.slow_queries)))
+
+def page_version():
+    # In-process writes bump the generation; data_version catches commits from anywhere else
+    return (RESPONSE_CACHE.generation, REPORT_POOL.data_version(), BAN_DATABASE.pool.data_version())
+
+def cached_page(view):
+    # Serves repeat loads of read-only pages from RESPONSE_CACHE and answers If-None-Match with 304
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('_flashes'):
+            # Flashed messages are rendered once into the page, so it can't be reused
+            return view(*args, **kwargs)
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        version = page_version()
+        entry = RESPONSE_CACHE.get(key, version)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed or session.get('_flashes'):
+                return response
+            entry = RESPONSE_CACHE.put(key, version, response.get_data(), response.mimetype)
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
+
+@app.after_request
+def invalidate_cached_pages(response):
+    if request.method == 'POST':
+        RESPONSE_CACHE.invalidate()
+    return response
 
-def import_data_from_csv(file_path):
-    with app.app_context():
-        if os.path.exists(file_path):
-            try:
-                db = get_db()
-                cursor = db.cursor()
-                
-                with open(file_path, mode='r', newline='', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        try:
-                            date_time = datetime.strptime(row[0], '%m/%d/%Y %I:%M %p')
-                            reporter = row[1]
-                            reportee = row[2]
-                            report_reason = row[3]
-                            evidence = row[4]
-                            punishment = row[5]
-                            
-                            cursor.execute('INSERT INTO report (date_time, reporter, reportee, report_reason, evidence, punishment) VALUES (?, ?, ?, ?, ?, ?)',
-                                           (date_time, reporter, reportee, report_reason, evidence, punishment))
-                        except ValueError as e:
-                            print(f"Error parsing date '{row[0]}': {e}")
-                
-                db.commit()
-                db.close()
-            except Exception as e:
-                print(f"Error reading CSV file: {e}")
-
-def export_report_to_csv():
-    output = io.BytesIO()
-    wrapper = io.TextIOWrapper(output, encoding='utf-8', newline='')
-    writer = csv.writer(wrapper)
-    conn = sqlite3.connect('reports.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM report")
-    rows = cursor.fetchall()
-    writer.writerow(["ID", "Date/Time", "Reporter", "Reportee", "Report Reason", "Evidence", "Punishment"])
-    writer.writerows(rows)
-    conn.close()
-    wrapper.flush()
-    output.seek(0)
-    output_binary = io.BytesIO(output.getvalue())
-    return send_file(output_binary, mimetype='text/csv', as_attachment=True, download_name='exported_reports.csv')
+def run_evidence_index(job, folder):
+    try:
+        index_evidence(job, REPORT_POOL, folder, app.config['EVIDENCE_AUTO_LINK'])
+    finally:
+        RESPONSE_CACHE.invalidate()
+
+def start_evidence_index():
+    folder = upload_folder()
+    if not os.path.isdir(folder):
+        return None, False
+    return JOBS.start('index_evidence', run_evidence_index, folder)
+
+def evidence_index_loop():
+    # Every worker runs this loop; the job lock means only one of them scans at a time
+    while True:
+        start_evidence_index()
+        time.sleep(app.config['EVIDENCE_INDEX_SECONDS'])
+
+def run_csv_import(job, file_path):
+    from csvimport import import_reports
+    try:
+        with writing_names(record=False):
+            import_reports(job, REPORT_POOL, file_path, NAME_INDEX)
+    finally:
+        RESPONSE_CACHE.invalidate()
+
+def stream_csv(pool, sql, params, header, download_name, compress=False):
+    # Rows are read in fetchmany chunks and written out as they arrive, so memory stays flat
+    # however many rows match and the download starts before the query finishes.
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        compressor = zlib.compressobj(wbits=31) if compress else None
+
+        def drain():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(data) if compressor else data
+
+        writer.writerow(header)
+        yield drain()
+        with pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                yield drain()
+        if compressor:
+            yield compressor.flush()
+
+    if compress:
+        download_name += '.gz'
+    return Response(generate(), mimetype='application/gzip' if compress else 'text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={download_name}'})
+
+def wants_gzip():
+    return request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
 
 @app.route('/search_user', methods=['GET'])
 def search_user():
-    username = request.args.get('username')
+    username = request.args.get('username', '').strip()
     db = get_db()
     ban_db = get_ban_db()
     cursor = db.cursor()
     ban_cursor = ban_db.cursor()
 
-    def clean_player_name(player_name):
-        cleaned_name = re.sub(r"\(.*\)", "", player_name).strip()
-        return cleaned_name
-
-    query = "SELECT * FROM report WHERE reporter = ? OR reportee = ?"
-    params = [username, username]
-    reports = cursor.execute(query, params).fetchall()
-    bans = ban_cursor.execute("SELECT * FROM bans").fetchall()
-    cleaned_username = clean_player_name(username)
-
-    filtered_bans = []
-    for ban in bans:
-        ban_player_name = ban[2]
-        cleaned_ban_player_name = clean_player_name(ban_player_name)
+    username_key = name_key(username)
+    reports = cursor.execute("SELECT * FROM report WHERE reporter_key = ? OR reportee_key = ?", (username_key, username_key)).fetchall()
+    bans = ban_cursor.execute("SELECT * FROM bans WHERE player_key = ? OR player_steam_id = ?", (username_key, username)).fetchall()
 
-        if cleaned_ban_player_name == cleaned_username:
-            filtered_bans.append({
-                "id": ban[0],
-                "date": ban[1],
-                "length": ban[6] or 'N/A',
-                "reason": ban[8],
-                "player_name": ban_player_name
-            })
-
-    db.close()
-    ban_db.close()
+    filtered_bans = [
+        {
+            "id": ban['id'],
+            "date": ban['date'],
+            "length": ban['length'] or 'N/A',
+            "reason": ban['reason'],
+            "player_name": ban['player_name']
+        } for ban in bans
+    ]
 
     user_data = {
         "username": username,
         "reports": [
             {
-                "id": report[0],
-                "date_time": report[1],
-                "report_reason": report[4],
-                "punishment": report[6] or 'N/A'
+                "id": report['id'],
+                "date_time": report['date_time'],
+                "report_reason": report['report_reason'],
+                "punishment": report['punishment'] or 'N/A'
             } for report in reports
         ],
         "bans": filtered_bans
@@ -165,157 +421,193 @@ def search_user():
     else:
         return jsonify({"error": "User not found"}), 404
 
-@app.route('/export_reports')
-def export_reports():
-    return export_report_to_csv()
-
-@app.route('/')
-def index():
-    db = get_db()
-    cursor = db.cursor()
-    
-    current_month = datetime.now().strftime('%Y-%m')
-    first_day_of_current_month = datetime.now().replace(day=1)
-    previous_month = (first_day_of_current_month - timedelta(days=1)).strftime('%Y-%m')
-    selected_month = request.args.get('selected_month', previous_month if request.args.get('deep_storage') == 'true' else current_month)
-    search_query = request.args.get('search_query', '').strip()
-    search_field = request.args.get('search_field', 'all')
-    sort_by = request.args.get('sort_by', 'date_time')
-    sort_order = request.args.get('sort_order', 'DESC')
-    deep_storage = request.args.get('deep_storage', 'false')
-    query = "SELECT * FROM report WHERE 1=1"
+class FilterError(ValueError):
+    def __init__(self, message, **redirect_args):
+        super().__init__(message)
+        self.redirect_args = redirect_args
+
+def report_filters(db, args, restrict_month=True):
+    # Shared by the reports page and its CSV export; returns the FROM source, WHERE clause and sort column
+    search_query = args.get('search_query', '').strip()
+    search_field = args.get('search_field', 'all')
+    sort_by = args.get('sort_by', 'relevance' if search_query else 'date_time')
+    sort_order = args.get('sort_order', 'DESC')
+    ban_filter = args.get('ban_filter', '')
+    now = format_timestamp(datetime.now())
+    source = "report"
+    source_params = []
+    query = "1=1"
     params = []
-    
-    if deep_storage == 'false':
-        query += " AND strftime('%Y-%m', date_time) = ?"
-        params.append(current_month)
-    else:
-        query += " AND strftime('%Y-%m', date_time) = ?"
-        params.append(selected_month)
-
-    if search_query:
-        if search_field == 'all':
-            query += " AND (reporter LIKE ? OR reportee LIKE ? OR report_reason LIKE ? OR punishment LIKE ?)"
-            like_query = f'%{search_query}%'
-            params.extend([like_query, like_query, like_query, like_query])
 
+    if ban_filter == 'active':
+        # Active bans are listed regardless of the month they were issued in
+        query += " AND expires_at > ?"
+        params.append(now)
+    elif ban_filter == 'expiring':
+        query += " AND expires_at > ? AND expires_at <= ?"
+        params.extend([now, format_timestamp(datetime.now() + timedelta(days=EXPIRING_SOON_DAYS))])
+    elif restrict_month:
+        if args.get('deep_storage', 'false') == 'false':
+            month_start, month_end = month_range(datetime.now())
+        else:
             try:
-                date_query = datetime.strptime(search_query, '%Y-%m-%d')
-                query += " OR date(date_time) = ?"
-                params.append(date_query.strftime('%Y-%m-%d'))
+                month_start, month_end = month_range(datetime.strptime(args.get('selected_month', ''), '%Y-%m'))
             except ValueError:
-                try:
-                    month_query = datetime.strptime(search_query, '%Y-%m')
-                    query += " OR strftime('%Y-%m', date_time) = ?"
-                    params.append(month_query.strftime('%Y-%m'))
-                except ValueError:
-                    pass
+                raise FilterError('Invalid month format. Use YYYY-MM.', deep_storage='true')
+        query += " AND date_time_epoch >= ? AND date_time_epoch < ?"
+        params.extend([month_start, month_end])
+
+    if args.get('evidence', '') == 'missing':
+        query += " AND NOT EXISTS (SELECT 1 FROM report_evidence WHERE report_evidence.report_id = report.id)"
+    elif args.get('evidence', '') == 'file_missing':
+        if indexed_folder(db) is None:
+            raise FilterError('The evidence folder has not been indexed yet.')
+        query += f" AND {MISSING_FILE_CLAUSE}"
+
+    if search_query:
+        use_fts = has_table(db, 'report_fts')
+        if search_field == 'all':
+            date_search = parse_search_range(search_query)
+            match = fts_query(search_query) if use_fts and not date_search else None
+            if match:
+                source = REPORT_FTS_SOURCE
+                source_params = [match]
+            else:
+                # One group, so a date match widens the text search without escaping the other filters
+                search = "reporter LIKE ? OR reportee LIKE ? OR report_reason LIKE ? OR punishment LIKE ?"
+                like_query = f'%{search_query}%'
+                search_params = [like_query, like_query, like_query, like_query]
+                if date_search:
+                    search += " OR (date_time_epoch >= ? AND date_time_epoch < ?)"
+                    search_params.extend(date_search)
+                query += f" AND ({search})"
+                params.extend(search_params)
 
         elif search_field in ['reporter', 'reportee', 'punishment']:
-            query += f" AND {search_field} LIKE ?"
-            like_query = f'%{search_query}%'
-            params.append(like_query)
+            match = fts_query(search_query, search_field) if use_fts else None
+            if match:
+                source = REPORT_FTS_SOURCE
+                source_params = [match]
+            else:
+                query += f" AND {search_field} LIKE ?"
+                like_query = f'%{search_query}%'
+                params.append(like_query)
+
+        elif search_field == 'report_reason':
+            # Exact reason match through the junction's (reason_id, report_id) index
+            query += (" AND report.id IN (SELECT report_reason.report_id FROM report_reason"
+                      " JOIN reason ON reason.id = report_reason.reason_id WHERE reason.name = ?)")
+            params.append(search_query)
 
         elif search_field == 'date':
             try:
                 date_query = datetime.strptime(search_query, '%Y-%m-%d')
-                query += " AND date(date_time) = ?"
-                params.append(date_query.strftime('%Y-%m-%d'))
+                query += " AND date_time_epoch >= ? AND date_time_epoch < ?"
+                params.extend(day_range(date_query))
             except ValueError:
-                flash('Invalid date format. Use YYYY-MM-DD.', 'danger')
-                return redirect(url_for('index'))
+                raise FilterError('Invalid date format. Use YYYY-MM-DD.')
 
         elif search_field == 'month':
             try:
                 month_query = datetime.strptime(search_query, '%Y-%m')
-                query += " AND strftime('%Y-%m', date_time) = ?"
-                params.append(month_query.strftime('%Y-%m'))
+                query += " AND date_time_epoch >= ? AND date_time_epoch < ?"
+                params.extend(month_range(month_query))
             except ValueError:
-                flash('Invalid month format. Use YYYY-MM.', 'danger')
-                return redirect(url_for('index'))
+                raise FilterError('Invalid month format. Use YYYY-MM.')
 
-    if sort_by == 'month':
-        query += " ORDER BY strftime('%Y-%m', date_time) " + sort_order
+    if sort_order not in ['ASC', 'DESC']:
+        sort_order = 'DESC'
+    if sort_by in REPORT_SORT_COLUMNS or (sort_by == 'relevance' and source != 'report'):
+        sort_column = sort_by
     else:
-        query += f" ORDER BY {sort_by} {sort_order}"
-
-    reports = cursor.execute(query, params).fetchall()
-    report_count = len(reports)
-
-    reports_list = []
-    for report in reports:
-        report_dict = dict(report)
-        try:
-            report_dict['date_time'] = datetime.strptime(report_dict['date_time'], '%Y-%m-%d %H:%M:%S')
-        except ValueError as e:
-            print(f"Error parsing date '{report_dict['date_time']}': {e}")
+        sort_column = 'date_time'
+    if ban_filter in ('active', 'expiring'):
+        # Sorting on expires_at keeps the ban filter a range on its index instead of a walk of the whole table
+        sort_column = 'expires_at'
+    elif sort_column == 'date_time':
+        # Dates, and the months they fall in, sort on the indexed integer timestamp
+        sort_column = 'date_time_epoch'
 
-        if "ban" in report_dict['punishment'].lower() or "propban" in report_dict['punishment'].lower():
-            try:
-                parts = report_dict['punishment'].split()
-                if len(parts) < 2:
-                    report_dict['ban_status'] = "Invalid Duration"
-                    continue
+    return source, source_params, query, params, sort_column, sort_order
 
-                duration_str = parts[0]
-                duration_value = int(duration_str)
-                unit = parts[1].lower()
-
-                if "day" in unit:
-                    ban_end_date = report_dict['date_time'] + timedelta(days=duration_value)
-                elif "week" in unit:
-                    ban_end_date = report_dict['date_time'] + timedelta(weeks=duration_value)
-                elif "month" in unit:
-                    ban_end_date = report_dict['date_time'] + timedelta(days=duration_value * 30)
-                elif "hour" in unit or "hr" in unit:
-                    ban_end_date = report_dict['date_time'] + timedelta(hours=duration_value)
-                else:
-                    ban_end_date = None
-
-                if ban_end_date:
-                    report_dict['ban_status'] = "Active" if datetime.now() < ban_end_date else "Expired"
-                else:
-                    report_dict['ban_status'] = "Unknown"
-            except (ValueError, IndexError):
-                report_dict['ban_status'] = "Invalid Duration"
-        else:
-            report_dict['ban_status'] = "N/A"
-            
-        evidence_list = report_dict['evidence'].split(',') if report_dict['evidence'] else []
-        formatted_evidence = []
-        for evidence in evidence_list:
-            evidence = evidence.strip()
-            if evidence.startswith('http://') or evidence.startswith('https://'):
-                formatted_evidence.append({'type': 'link', 'url': evidence})
-            else:
-                formatted_evidence.append({'type': 'file', 'path': evidence})
+@app.route('/export_reports')
+def export_reports():
+    # Takes the same filters as the reports page; the month filter only applies when one is given
+    args = request.args.to_dict()
+    restrict_month = 'deep_storage' in args or 'selected_month' in args
+    try:
+        source, source_params, query, params, sort_column, sort_order = report_filters(get_db(), args, restrict_month)
+    except FilterError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('index', **e.redirect_args))
 
-        report_dict['evidence'] = json.dumps(formatted_evidence)
-        reports_list.append(report_dict)
+    sql = (f"SELECT report.id, date_time, reporter, reportee, report_reason, evidence, punishment FROM {source} "
+           f"WHERE {query} ORDER BY {sort_column} {sort_order}, report.id {sort_order}")
+    return stream_csv(REPORT_POOL, sql, source_params + params,
+                      ["ID", "Date/Time", "Reporter", "Reportee", "Report Reason", "Evidence", "Punishment"],
+                      'exported_reports.csv', wants_gzip())
 
-    db.close()
+@app.route('/')
+@cached_page
+def index():
+    selected_month = default_month(request.args)
+    search_query = request.args.get('search_query', '').strip()
+    search_field = request.args.get('search_field', 'all')
+    sort_by = request.args.get('sort_by', 'relevance' if search_query else 'date_time')
+    sort_order = request.args.get('sort_order', 'DESC')
+    deep_storage = request.args.get('deep_storage', 'false')
+    ban_filter = request.args.get('ban_filter', '')
+    evidence_filter = request.args.get('evidence', '')
 
-    return render_template('index.html', reports=reports_list, search_query=search_query, search_field=search_field, sort_by=sort_by, sort_order=sort_order, deep_storage=deep_storage, selected_month=selected_month, report_count=report_count)
+    # Rows are fetched page by page from /api/v1/reports; the filters are only checked here
+    try:
+        report_filters(get_db(), dict(request.args.to_dict(), selected_month=selected_month))
+    except FilterError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('index', **e.redirect_args))
+
+    api_args = dict(request.args.to_dict(), deep_storage=deep_storage, selected_month=selected_month)
+    return render_template('index.html', search_query=search_query, search_field=search_field, sort_by=sort_by, sort_order=sort_order, deep_storage=deep_storage, selected_month=selected_month, ban_filter=ban_filter, evidence_filter=evidence_filter, api_args=api_args, page_size=PAGE_SIZE)
+
+@app.route('/active_bans', methods=['GET'])
+def active_bans():
+    now = datetime.now()
+    within_days = request.args.get('within_days', type=float)
+    query = " WHERE expires_at > ?"
+    params = [format_timestamp(now)]
+    if within_days is not None:
+        query += " AND expires_at <= ?"
+        params.append(format_timestamp(now + timedelta(days=within_days)))
+    query += " ORDER BY expires_at"
+
+    reports = get_db().execute("SELECT id, date_time, reporter, reportee, punishment, expires_at FROM report" + query, params).fetchall()
+    bans = get_ban_db().execute("SELECT id, date, player_name, player_steam_id, admin_name, length, reason, expires_at FROM bans" + query, params).fetchall()
+    return jsonify({
+        "reports": [dict(report) for report in reports],
+        "bans": [dict(ban) for ban in bans]
+    })
 
 @app.route('/users', methods=['GET'])
 def users():
     return render_template('users.html')
 
-@app.route('/bans', methods=['GET'])
-def bans():
-    db = get_ban_db()
-    cursor = db.cursor()
+def ban_filters(db, args):
+    search_query = args.get('search_query', '').strip()
+    search_field = args.get('search_field', 'all')
+    sort_by = args.get('sort_by', 'relevance' if search_query else 'date')
+    sort_order = args.get('sort_order', 'DESC')
 
-    search_query = request.args.get('search_query', '').strip()
-    search_field = request.args.get('search_field', 'all')
-    sort_by = request.args.get('sort_by', 'date')
-    sort_order = request.args.get('sort_order', 'DESC')
-
-    query = "SELECT * FROM bans WHERE 1=1"
+    source = "bans"
+    source_params = []
+    query = "1=1"
     params = []
 
     if search_query:
-        if search_field == 'all':
+        use_fts = has_table(db, 'bans_fts')
+        if search_field in ['all', 'player_name', 'admin_name', 'reason'] and use_fts and fts_query(search_query):
+            source = BAN_FTS_SOURCE
+            source_params = [fts_query(search_query, None if search_field == 'all' else search_field)]
+        elif search_field == 'all':
             query += " AND (player_name LIKE ? OR admin_name LIKE ? OR reason LIKE ?)"
             like_query = f'%{search_query}%'
             params.extend([like_query, like_query, like_query])
@@ -331,50 +623,201 @@ def bans():
         elif search_field == 'date':
             try:
                 date_query = datetime.strptime(search_query, '%Y-%m-%d')
-                query += " AND date(date) = ?"
-                params.append(date_query.strftime('%Y-%m-%d'))
+                query += " AND date_epoch >= ? AND date_epoch < ?"
+                params.extend(day_range(date_query, durations.ban_site_timezone))
             except ValueError:
-                flash('Invalid date format. Use YYYY-MM-DD.', 'danger')
-                return redirect(url_for('bans'))
+                raise FilterError('Invalid date format. Use YYYY-MM-DD.')
+
+    # Per-admin and per-player views of a mirrored ban list
+    for column in ('admin_steam_id', 'player_steam_id', 'site'):
+        value = args.get(column, '').strip()
+        if value:
+            query += f" AND {column} = ?"
+            params.append(value)
+
+    if sort_order not in ['ASC', 'DESC']:
+        sort_order = 'DESC'
+    if sort_by in BAN_SORT_COLUMNS or (sort_by == 'relevance' and source != 'bans'):
+        sort_column = sort_by
+    else:
+        sort_column = 'date'
+    if sort_column == 'date':
+        # The scraped date text doesn't sort chronologically; its integer timestamp does
+        sort_column = 'date_epoch'
 
-    if sort_by in ['date', 'player_name', 'admin_name', 'reason']:
-        query += f" ORDER BY {sort_by} {sort_order}"
+    return source, source_params, query, params, sort_column, sort_order
 
-    bans = cursor.execute(query, params).fetchall()
+@app.route('/bans', methods=['GET'])
+@cached_page
+def bans():
+    search_query = request.args.get('search_query', '').strip()
+    search_field = request.args.get('search_field', 'all')
+    sort_by = request.args.get('sort_by', 'relevance' if search_query else 'date')
+    sort_order = request.args.get('sort_order', 'DESC')
 
-    bans_list = []
-    for ban in bans:
-        ban_dict = dict(ban)
-        evidence_list = ban_dict['evidence'].split(',') if ban_dict['evidence'] else []
-        formatted_evidence = []
-        for evidence in evidence_list:
-            evidence = evidence.strip()
-            if evidence.startswith('http://') or evidence.startswith('https://'):
-                formatted_evidence.append({'type': 'link', 'url': evidence})
-            else:
-                formatted_evidence.append({'type': 'file', 'path': evidence})
+    try:
+        ban_filters(get_ban_db(), request.args)
+    except FilterError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('bans', **e.redirect_args))
 
-        ban_dict['evidence'] = json.dumps(formatted_evidence)
-        bans_list.append(ban_dict)
+    return render_template('bans.html', search_query=search_query, search_field=search_field, sort_by=sort_by, sort_order=sort_order, api_args=request.args.to_dict(), page_size=PAGE_SIZE,
+                           admin_steam_id=request.args.get('admin_steam_id', '').strip(), my_steam_id=saved_steam_id())
 
-    db.close()
+@app.route('/export_bans')
+def export_bans():
+    try:
+        source, source_params, query, params, sort_column, sort_order = ban_filters(get_ban_db(), request.args)
+    except FilterError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('bans', **e.redirect_args))
+
+    sql = (f"SELECT bans.id, date, player_name, player_steam_id, admin_name, admin_steam_id, length, reason, evidence, expires_at, site FROM {source} "
+           f"WHERE {query} ORDER BY {sort_column} {sort_order}, bans.id {sort_order}")
+    return stream_csv(BAN_DATABASE.pool, sql, source_params + params,
+                      ["ID", "Date", "Player", "Player Steam ID", "Admin", "Admin Steam ID", "Length", "Reason", "Evidence", "Expires At", "Site"],
+                      'exported_bans.csv', wants_gzip())
+
+def api_page(db, filters, evidence_table, owner_column, fields, row_value):
+    # One keyset page of a listing as JSON-ready dicts, limited to the requested fields
+    source, source_params, query, params, sort_column, sort_order = filters
+    selected = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or fields
+    unknown = [field for field in selected if field not in fields]
+    if unknown:
+        raise FilterError(f"Unknown fields: {', '.join(unknown)}")
+
+    page_size = get_page_size()
+    cursor = request.args.get('cursor')
+    after, after_id = decode_cursor(cursor)
+    keyset, keyset_params = keyset_clause(sort_column, sort_order, after, after_id)
+    rows = db.execute(f"SELECT * FROM {source} WHERE ({query}){keyset} ORDER BY {sort_column} {sort_order}, id {sort_order} LIMIT ?",
+                      source_params + params + keyset_params + [page_size + 1]).fetchall()
+    page = {}
+    if not cursor:
+        # Counted once, with the first page
+        page['total'] = db.execute(f"SELECT COUNT(*) FROM {source} WHERE {query}", source_params + params).fetchone()[0]
+    page['next_cursor'] = encode_cursor(rows[page_size - 1][sort_column], rows[page_size - 1]['id']) if len(rows) > page_size else None
+    rows = rows[:page_size]
+    evidence = fetch_evidence(db, evidence_table, owner_column, [row['id'] for row in rows]) if 'evidence' in selected else {}
+    page['items'] = [{field: evidence[row['id']] if field == 'evidence' else row_value(row, field) for field in selected} for row in rows]
+    return page
+
+@app.route('/api/v1/reports')
+@cached_page
+def api_reports():
+    # Same filters as the reports page and export; the month filter only applies when one is given
+    db = get_db()
+    args = request.args.to_dict()
+    restrict_month = 'deep_storage' in args or 'selected_month' in args
+    if restrict_month:
+        args['selected_month'] = default_month(args)
+    now = format_timestamp(datetime.now())
 
-    return render_template('bans.html', bans=bans_list, search_query=search_query, search_field=search_field, sort_by=sort_by, sort_order=sort_order)
+    def row_value(row, field):
+        return ban_status(row['punishment'], row['expires_at'], now) if field == 'ban_status' else row[field]
+
+    try:
+        page = api_page(db, report_filters(db, args, restrict_month), 'report_evidence', 'report_id', REPORT_API_FIELDS, row_value)
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    flag_missing_files(db, [item for report in page['items'] for item in report.get('evidence', []) if 'path' in item])
+    return jsonify(page)
+
+def flag_missing_files(db, items):
+    # Marks file evidence the evidence index doesn't know about; nothing is flagged before the first scan
+    missing = missing_file_locations(db, [item['path'] for item in items]) if items else None
+    for item in items:
+        if missing is not None and item['path'] in missing:
+            item['missing'] = True
+
+@app.route('/api/v1/reports/<int:id>/evidence_suggestions')
+def evidence_suggestions(id):
+    db = get_db()
+    report = db.execute('SELECT id, date_time_epoch, reporter, reportee FROM report WHERE id = ?', (id,)).fetchone()
+    if report is None:
+        abort(404)
+    return jsonify({'indexed': indexed_folder(db) is not None, 'suggestions': suggest_evidence(db, report)})
+
+@app.route('/api/v1/bans')
+@cached_page
+def api_bans():
+    db = get_ban_db()
+    try:
+        return jsonify(api_page(db, ban_filters(db, request.args), 'ban_evidence', 'ban_id', BAN_API_FIELDS, lambda row, field: row[field]))
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+
+def run_ban_scrape(job, steam_id, full_scrape):
+    # steam_id is None for a mirror of every admin's bans
+    sites = ban_sites()
+    bans = []
+    job.update(sites_total=len(sites), sites_done=0, bans_stored=0)
+    with writing_names(record=False):
+        try:
+            for site in sites:
+                job.update(site=site)
+                scraper = BanScraper(site, steam_id, job=job)
+                try:
+                    if full_scrape:
+                        site_bans = scraper.scrape_bans()
+                        job.check_cancelled()
+                        job.increment('bans_stored', BAN_DATABASE.insert_bans(site_bans))
+                    else:
+                        site_bans = scraper.scrape_new_bans(BAN_DATABASE)
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    # One unreachable ban site doesn't stop the others
+                    job.add_error(f"{site}: {e}")
+                    continue
+                finally:
+                    job.increment('sites_done')
+                bans.extend(site_bans)
+        finally:
+            RESPONSE_CACHE.invalidate()
+        add_ban_names(bans)
 
 @app.route('/scrape_bans', methods=['POST'])
 def scrape_bans():
-    global is_scraping_bans
-    if not is_scraping_bans:
-        is_scraping_bans = True
-        steam_id = request.form['steam_id'].strip()
+    steam_id = request.form.get('steam_id', '').strip()
+    mirror = bool(request.form.get('mirror'))
+    if not steam_id and not mirror:
+        message = 'Enter your steam ID, or mirror the bans of every admin.'
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': message}), 400
+        flash(message, 'danger')
+        return redirect(url_for('settings'))
+    if steam_id:
         with open('steam_id.txt', 'w') as file:
             file.write(steam_id)
-        
-        scraper = BanScraper(BANS_URL, steam_id)
-        bans = scraper.scrape_bans()
-        BAN_DATABASE.insert_bans(bans)
-        is_scraping_bans = False
-        return redirect(url_for('bans'))
+
+    job, started = JOBS.start('scrape_bans', run_ban_scrape, None if mirror else steam_id, bool(request.form.get('full_scrape')))
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202 if started else 409
+    if not started:
+        flash('A ban import is already running.', 'warning')
+    return redirect(url_for('settings', job=job.id))
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/files/<name>', methods=['GET'])
+def job_file(job_id, name):
+    job = JOBS.get(job_id)
+    if job is None or name not in job.files:
+        abort(404)
+    return send_file(job.files[name], as_attachment=True, download_name=name)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = JOBS.cancel(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
 
 @app.route('/add', methods=['GET', 'POST'])
 def add_report():
@@ -388,24 +831,22 @@ def add_report():
         reporter = request.form['reporter']
         reportee = request.form['reportee']
 
-        report_reasons = request.form.getlist('report_reason')
-        if 'Other' in report_reasons:
-            other_reason = request.form.get('other_reason', '').strip()
-            if other_reason:
-                report_reasons = ['Other']
-                report_reasons.append(other_reason)
-
-        report_reason = ', '.join(report_reasons)
+        report_reason = form_reasons(request.form)
 
         evidence = request.form.get('evidence', '').strip()
         punishment = request.form['punishment']
 
         db = get_db()
         cursor = db.cursor()
-        cursor.execute('INSERT INTO report (date_time, reporter, reportee, report_reason, evidence, punishment) VALUES (?, ?, ?, ?, ?, ?)',
-                       (date_time, reporter, reportee, report_reason, evidence, punishment))
-        db.commit()
-        db.close()
+        with writing_names():
+            cursor.execute('INSERT INTO report (date_time, reporter, reportee, report_reason, evidence, punishment, reporter_key, reportee_key, expires_at, date_time_epoch) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                           (date_time, reporter, reportee, report_reason, evidence, punishment, name_key(reporter), name_key(reportee), report_expiry(date_time, punishment), report_epoch(date_time)))
+            report_id = cursor.lastrowid
+            store_evidence(cursor, 'report_evidence', 'report_id', report_id, evidence)
+            store_reasons(cursor, report_id, report_reason)
+            db.commit()
+            NAME_INDEX.add(reporter, date_time)
+            NAME_INDEX.add(reportee, date_time)
 
         flash('Report added successfully!', 'success')
         if request.form['submit_type'] == 'add_report':
@@ -413,7 +854,7 @@ def add_report():
         elif request.form['submit_type'] == 'add_report_and_create_another':
             return redirect(url_for('add_report'))
 
-    return render_template('add_report.html')
+    return render_template('add_report.html', reason_choices=listed_reasons(get_db()))
 
 @app.route('/add_ban', methods=['GET', 'POST'])
 def add_ban():
@@ -437,8 +878,10 @@ def add_ban():
 
         evidence = request.form.get('evidence', '').strip()
         length = request.form['length']
-        ban_item = Ban(date_time, banned, "", "You", "", evidence, length, ban_reason)
-        BAN_DATABASE.insert_ban(ban_item)
+        ban_item = Ban(date_time, banned, "", "You", saved_steam_id(), evidence, length, ban_reason)
+        with writing_names():
+            BAN_DATABASE.insert_ban(ban_item)
+            add_ban_names([ban_item])
 
         flash('Ban added successfully!', 'success')
         if request.form['submit_type'] == 'add_ban':
@@ -462,84 +905,88 @@ def edit_report(id):
         reporter = request.form['reporter']
         reportee = request.form['reportee']
 
-        report_reasons = request.form.getlist('report_reason')
-        if 'Other' in report_reasons:
-            other_reason = request.form.get('other_reason', '').strip()
-            if other_reason:
-                report_reasons = ['Other']
-                report_reasons.append(other_reason)
-
-        report_reason = ', '.join(report_reasons)
+        report_reason = form_reasons(request.form)
 
         evidence = request.form.get('evidence', '').strip()
         punishment = request.form['punishment']
 
-        cursor.execute('UPDATE report SET date_time = ?, reporter = ?, reportee = ?, report_reason = ?, evidence = ?, punishment = ? WHERE id = ?',
-                       (date_time, reporter, reportee, report_reason, evidence, punishment, id))
-        db.commit()
-        db.close()
+        with writing_names():
+            previous = cursor.execute('SELECT reporter, reportee FROM report WHERE id = ?', (id,)).fetchone()
+            cursor.execute('UPDATE report SET date_time = ?, reporter = ?, reportee = ?, report_reason = ?, evidence = ?, punishment = ?, reporter_key = ?, reportee_key = ?, expires_at = ?, date_time_epoch = ? WHERE id = ?',
+                           (date_time, reporter, reportee, report_reason, evidence, punishment, name_key(reporter), name_key(reportee), report_expiry(date_time, punishment), report_epoch(date_time), id))
+            store_evidence(cursor, 'report_evidence', 'report_id', id, evidence)
+            store_reasons(cursor, id, report_reason)
+            db.commit()
+            if previous:
+                NAME_INDEX.remove(previous['reporter'])
+                NAME_INDEX.remove(previous['reportee'])
+                NAME_INDEX.add(reporter, date_time)
+                NAME_INDEX.add(reportee, date_time)
         flash('Report updated successfully!', 'success')
         return redirect(url_for('index'))
 
     report = cursor.execute('SELECT * FROM report WHERE id = ?', (id,)).fetchone()
+    reason_choices = listed_reasons(db)
     if report:
         report = dict(report)
-        report['date_time'] = datetime.strptime(report['date_time'], '%Y-%m-%d %H:%M:%S')
-
-        reasons_list = report['report_reason'].split(', ')
-        if 'Other' in reasons_list:
-            report['other_reason'] = reasons_list.pop()
-        else:
-            report['other_reason'] = ''
+        report['date_time'] = datetime.fromtimestamp(report['date_time_epoch'])
 
-        report['report_reason'] = ', '.join(reasons_list)
+        reasons = fetch_reasons(db, id)
+        report['reasons'] = [row['name'] for row in reasons]
+        report['other_reason'] = next((row['detail'] or '' for row in reasons if row['name'] == OTHER_REASON), '')
+        # Keep reasons that are no longer offered on the form (e.g. legacy "ARDM") ticked
+        reason_choices += [name for name in report['reasons'] if name not in reason_choices]
 
-    db.close()
-    return render_template('edit_report.html', report=report)
+    return render_template('edit_report.html', report=report, reason_choices=reason_choices)
 
 @app.route('/delete/<int:id>')
 def delete_report(id):
     db = get_db()
     cursor = db.cursor()
-    cursor.execute('DELETE FROM report WHERE id = ?', (id,))
-    db.commit()
-    db.close()
+    with writing_names():
+        report = cursor.execute('SELECT reporter, reportee FROM report WHERE id = ?', (id,)).fetchone()
+        cursor.execute('DELETE FROM report WHERE id = ?', (id,))
+        db.commit()
+        RESPONSE_CACHE.invalidate()
+        if report:
+            NAME_INDEX.remove(report['reporter'])
+            NAME_INDEX.remove(report['reportee'])
     flash('Report deleted successfully!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/stats')
+@cached_page
 def stats():
-    db = get_db()
-    cursor = db.cursor()
-
-    total_reports = cursor.execute('SELECT COUNT(*) FROM report').fetchone()[0]
-    reports_per_reporter = cursor.execute('SELECT reporter, COUNT(*) FROM report GROUP BY reporter').fetchall()
-    reports_per_reportee = cursor.execute('SELECT reportee, COUNT(*) FROM report GROUP BY reportee').fetchall()
-    reports_per_reason = cursor.execute('SELECT report_reason, COUNT(*) FROM report GROUP BY report_reason').fetchall()
-    monthly_reports = cursor.execute('SELECT strftime("%Y-%m", date_time) as month, COUNT(*) FROM report GROUP BY month').fetchall()
-    db.close()
-
-    reports_per_reporter = [{'label': row['reporter'], 'value': row[1]} for row in reports_per_reporter]
-    reports_per_reportee = [{'label': row['reportee'], 'value': row[1]} for row in reports_per_reportee]
-    reports_per_reason = [{'label': row['report_reason'], 'value': row[1]} for row in reports_per_reason]
-    monthly_reports = [{'label': row['month'], 'value': row[1]} for row in monthly_reports]
-    return render_template('stats.html', total_reports=total_reports,
-                           reports_per_reporter=reports_per_reporter,
-                           reports_per_reportee=reports_per_reportee,
-                           reports_per_reason=reports_per_reason,
-                           monthly_reports=monthly_reports)
+    stats = read_report_stats(get_db())
+    return render_template('stats.html', total_reports=stats['total'],
+                           reports_per_reporter=stats['reporter'],
+                           reports_per_reportee=stats['reportee'],
+                           reports_per_reason=stats['reason'],
+                           monthly_reports=stats['month'])
 
 @app.route('/stream_file/<path:file_path>')
 def stream_file(file_path):
     if not file_path or '..' in file_path:
         flash('Invalid file path.', 'danger')
         return redirect(url_for('index'))
-    safe_path = os.path.join(UPLOAD_FOLDER, file_path)
-    if os.path.isfile(safe_path):
-        return send_file(safe_path, as_attachment=True)
-    else:
-        flash('File not found.', 'danger')
-        return redirect(url_for('index'))
+    # Range requests get 206 Partial Content, validated against the file's ETag/Last-Modified (If-Range,
+    # If-None-Match, If-Modified-Since), and only the requested bytes are read, in chunks, from disk.
+    # ?inline=1 is for the evidence modal's player; otherwise the file downloads as before.
+    as_attachment = request.args.get('inline') != '1'
+    try:
+        return send_from_directory(upload_folder(), file_path, as_attachment=as_attachment)
+    except NotFound:
+        pass
+    # Evidence entered as a bare file name can live in a subfolder; the evidence index knows where
+    row = get_db().execute('SELECT path FROM evidence_file WHERE name = ? ORDER BY mtime DESC LIMIT 1',
+                           (normalize_location(file_path),)).fetchone()
+    if row:
+        try:
+            return send_from_directory(upload_folder(), row['path'], as_attachment=as_attachment)
+        except NotFound:
+            pass
+    flash('File not found.', 'danger')
+    return redirect(url_for('index'))
 
 @app.route('/save_hotkey', methods=['POST'])
 def save_hotkey():
@@ -547,11 +994,8 @@ def save_hotkey():
     
     if hotkey:
         try:
-            with open('config.json', 'r+') as config_file:
-                config = json.load(config_file)
-                config['shortcut'] = hotkey
-                write_config(config)
-                flash('Hotkey saved successfully!', 'success')
+            CONFIG.update(shortcut=hotkey)
+            flash('Hotkey saved successfully!', 'success')
         except Exception as e:
             flash('Error saving hotkey!', 'danger')
     else:
@@ -561,33 +1005,48 @@ def save_hotkey():
 
 @app.route('/settings', methods=['GET'])
 def settings():
-    steam_id = ''
-    try:
-        with open('steam_id.txt', 'r') as file:
-            steam_id = file.read().strip()
-    except FileNotFoundError:
-        pass
-    return render_template('settings.html', upload_folder=UPLOAD_FOLDER, steam_id=steam_id)
+    jobs = [JOBS.latest(kind) for kind in ('scrape_bans', 'import_csv', 'index_evidence')]
+    evidence_scan = indexed_folder(get_db())
+    return render_template('settings.html', upload_folder=upload_folder(), steam_id=saved_steam_id(), ban_sites='\n'.join(ban_sites()), jobs=[job.to_dict() for job in jobs if job],
+                           evidence_scan={'folder': evidence_scan[0], 'finished_at': datetime.fromtimestamp(evidence_scan[1]).strftime('%Y-%m-%d %H:%M'),
+                                          'files': evidence_scan[2]} if evidence_scan else None)
+
+@app.route('/index_evidence', methods=['POST'])
+def index_evidence_now():
+    job, started = start_evidence_index()
+    if job is None:
+        flash('The upload folder does not exist.', 'danger')
+    elif not started:
+        flash('The evidence folder is already being indexed.', 'warning')
+    return redirect(url_for('settings'))
 
 @app.route('/update_settings', methods=['POST'])
 def update_settings():
-    global UPLOAD_FOLDER
-
     if 'upload_folder' in request.form:
         new_upload_folder = request.form['upload_folder'].strip()
         if os.path.isdir(new_upload_folder):
-            UPLOAD_FOLDER = new_upload_folder
-            config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-            write_config(config)
+            CONFIG.update(UPLOAD_FOLDER=new_upload_folder)
+            start_evidence_index()
             flash('Settings updated successfully!', 'success')
         else:
             flash('Invalid folder path. Please ensure the folder exists.', 'danger')
 
+    if 'ban_sites' in request.form:
+        sites = [site.strip().rstrip('/') for site in request.form['ban_sites'].splitlines() if site.strip()]
+        if sites and all(urlparse(site).scheme in ('http', 'https') and urlparse(site).netloc for site in sites):
+            CONFIG.update(BAN_SITES=sites)
+            flash('Ban sites updated successfully!', 'success')
+        else:
+            flash('Enter at least one ban list URL, one per line, starting with http:// or https://.', 'danger')
+
     if 'import_csv' in request.form:
         csv_path = request.form['csv_path'].strip()
         if os.path.exists(csv_path):
-            import_data_from_csv(csv_path)
-            flash('CSV data imported successfully!', 'success')
+            job, started = JOBS.start('import_csv', run_csv_import, csv_path)
+            if started:
+                flash('CSV import started.', 'success')
+            else:
+                flash('A CSV import is already running.', 'warning')
         else:
             flash('Invalid CSV file path. Please ensure the file exists.', 'danger')
 
@@ -598,14 +1057,11 @@ def autocomplete():
     query = request.args.get('query', '')
     if not query:
         return jsonify([])
-    
-    conn = sqlite3.connect('reports.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT reporter FROM report WHERE reporter LIKE ? UNION SELECT DISTINCT reportee FROM report WHERE reportee LIKE ?", ('%' + query + '%', '%' + query + '%'))
-    names = cursor.fetchall()
-    conn.close()
-    names = [name[0] for name in names]
-    return jsonify(names)
+
+    limit = request.args.get('limit', 10, type=int)
+    refresh_name_index()
+    return jsonify(NAME_INDEX.search(query, limit=max(1, min(limit, 50))))
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=4200, debug=False)
+    # The single-process server Electron starts; serve.py runs the multi-worker server
+    create_app().run(host='0.0.0.0', port=4200, debug=False)
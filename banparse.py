@@ -0,0 +1,103 @@
+import importlib.util
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 16384
+
+class RowParser(HTMLParser):
+    # Emits each table row as soon as it closes, as a list of (cell text, first link text) pairs,
+    # without keeping a document tree around.
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.row = None
+        self.cell = None
+        self.link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.end_row()
+            self.row = []
+        elif tag == 'td' and self.row is not None:
+            self.end_cell()
+            self.cell = [[], None]
+        elif tag == 'a' and self.cell is not None and self.cell[1] is None:
+            self.link = []
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self.link is not None:
+            self.cell[1] = ''.join(self.link)
+            self.link = None
+        elif tag == 'td':
+            self.end_cell()
+        elif tag in ('tr', 'table', 'tbody'):
+            self.end_row()
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell[0].append(data)
+            if self.link is not None:
+                self.link.append(data)
+
+    def end_cell(self):
+        if self.cell is not None:
+            if self.link is not None:
+                self.cell[1] = ''.join(self.link)
+                self.link = None
+            self.row.append((''.join(self.cell[0]), self.cell[1]))
+            self.cell = None
+
+    def end_row(self):
+        if self.row is not None:
+            self.end_cell()
+            self.rows.append(self.row)
+            self.row = None
+
+    def feed_rows(self, chunk):
+        self.feed(chunk)
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close_rows(self):
+        self.close()
+        self.end_row()
+        rows, self.rows = self.rows, []
+        return rows
+
+def link_text(cell):
+    link = cell.find('.//a')
+    return None if link is None else ''.join(link.itertext())
+
+def html_parser_rows(content):
+    parser = RowParser()
+    text = content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+    for start in range(0, len(text), CHUNK_SIZE):
+        yield from parser.feed_rows(text[start:start + CHUNK_SIZE])
+    yield from parser.close_rows()
+
+def lxml_rows(content):
+    from lxml import etree
+    parser = etree.HTMLPullParser(events=('end',), tag='tr')
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    for start in range(0, len(data) + 1, CHUNK_SIZE):
+        if start < len(data):
+            parser.feed(data[start:start + CHUNK_SIZE])
+        else:
+            parser.close()
+        for _, row in parser.read_events():
+            yield [(''.join(cell.itertext()), link_text(cell)) for cell in row.iterchildren('td')]
+            # Drop finished rows so memory stays flat on long pages
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+
+BACKENDS = {'html.parser': html_parser_rows}
+# Only checks that lxml is installed; the import itself waits until a page is parsed
+if importlib.util.find_spec('lxml') is not None:
+    BACKENDS['lxml'] = lxml_rows
+DEFAULT_BACKEND = 'lxml' if 'lxml' in BACKENDS else 'html.parser'
+
+def extract_rows(content, backend=None):
+    # The first row is the table header; rows without <td> cells aren't bans
+    rows = BACKENDS[backend or DEFAULT_BACKEND](content)
+    next(rows, None)
+    return [row for row in rows if row]
@@ -1,10 +1,64 @@
-import sqlite3
-import requests
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from banparse import DEFAULT_BACKEND, extract_rows
+from database import BAN_MIGRATIONS, migrate, schema_current, get_pool
+from durations import ban_epoch, epoch_ban_expiry
+from evidence import store_evidence
+from jobs import Job
+from metrics import SCRAPE_FETCH_SECONDS, SCRAPE_PARSE_SECONDS
+from names import name_key
+
+# (connect, read) seconds; a stalled ban site fails the page instead of hanging the scrape
+REQUEST_TIMEOUT = (5, 20)
+MIN_WORKERS = 1
+MAX_WORKERS = 8
+PARSE_WORKERS = 2
+SLOW_PAGE_SECONDS = 3
+
+def create_session():
+    # requests/urllib3 are imported on the first scrape rather than at server startup
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'], raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=MAX_WORKERS)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Shared by every scrape so page requests reuse keep-alive connections
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+BAN_COLUMNS = 'date, player_name, player_steam_id, admin_name, admin_steam_id, evidence, length, reason, site'
+
+INSERT_COLUMNS = '''bans (date, player_name, player_steam_id, admin_name, admin_steam_id, length, reason, evidence, site, player_key, expires_at, date_epoch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+# Scraped bans seen again are skipped through the unique key on (date, player, admin, reason, site)
+INSERT_BAN = f'INSERT OR IGNORE INTO {INSERT_COLUMNS}'
+# Bans added by hand have no steam IDs and minute-resolution dates, so they're outside that key and always stored
+INSERT_MANUAL_BAN = f'INSERT INTO {INSERT_COLUMNS}'
+
+def ban_values(ban):
+    epoch = ban_epoch(ban.date, ban.site)
+    return (ban.date, ban.player_name, ban.player_steam_id, ban.admin_name, ban.admin_steam_id, ban.length, ban.reason, ban.evidence, ban.site,
+            name_key(ban.player_name), epoch_ban_expiry(epoch, ban.length), epoch)
+
+def ban_key(ban):
+    return (ban.date, ban.player_steam_id, ban.admin_steam_id, ban.reason, ban.site)
 
 class Ban:
-    def __init__(self, date, player_name, player_steam_id, admin_name, admin_steam_id, evidence, length, reason):
+    def __init__(self, date, player_name, player_steam_id, admin_name, admin_steam_id, evidence, length, reason, site=''):
         self.date = date
         self.player_name = player_name
         self.player_steam_id = player_steam_id
@@ -13,6 +67,8 @@ class Ban:
         self.length = length
         self.reason = reason
         self.evidence = evidence
+        # The ban list URL the ban was scraped from; empty for bans added by hand
+        self.site = site
 
     def __repr__(self):
         return (f"Ban(Date: {self.date}, Player: {self.player_name}, PlayerSteamID: {self.player_steam_id}, "
@@ -20,62 +76,202 @@ class Ban:
                 f"Length: {self.length}, Reason: {self.reason}), Evidence: {self.evidence}")
 
 class BanScraper:
-    def __init__(self, base_url, admin_steam_id, max_pages=50):
+    # With an admin_steam_id only that admin's bans are kept; without one every row is kept, so one
+    # scrape mirrors the whole ban list and per-admin views become queries on the stored bans.
+    def __init__(self, base_url, admin_steam_id=None, max_pages=50, job=None, session=None, parser_backend=None):
         self.base_url = base_url
         self.admin_steam_id = admin_steam_id
         self.max_pages = max_pages
+        self.job = job or Job('scrape_bans')
+        self.session = session or get_session()
+        self.parser_backend = parser_backend
+        self.validators = {}
+
+    def page_url(self, page_num):
+        return f"{self.base_url}/index.php?page={page_num}"
+
+    def state_name(self, kind, url):
+        # A mirror and each single-admin scrape stop at different rows, so each keeps its own high-water mark and validators
+        return f"{kind}:{self.admin_steam_id or 'all'}:{url}"
+
+    def wanted(self, ban):
+        return self.admin_steam_id is None or ban.admin_steam_id == self.admin_steam_id
 
-    def fetch_page(self, page_num):
-        page_url = f"{self.base_url}/index.php?page={page_num}"
+    def fetch_page(self, page_num, validators=None):
+        # Returns None when the server answers a conditional request with 304 Not Modified
+        page_url = self.page_url(page_num)
         print(f"Scraping page: {page_url}")
-        response = requests.get(page_url)
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        started = time.perf_counter()
+        try:
+            response = self.session.get(page_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except Exception:
+            SCRAPE_FETCH_SECONDS.observe(time.perf_counter() - started, 'error')
+            raise
+        SCRAPE_FETCH_SECONDS.observe(time.perf_counter() - started, response.status_code)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        self.validators[page_url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
         return response.content
 
-    def parse_bans(self, content):
+    def parse_rows(self, content):
+        started = time.perf_counter()
         ban_list = []
-        soup = BeautifulSoup(content, 'html.parser')
-        ban_entries = soup.find_all('tr')[1:]
-
-        for ban_entry in ban_entries:
-            columns = ban_entry.find_all('td')
-            if len(columns) > 0:
-                date = columns[0].text.strip()
-                player_name = columns[1].text.split('(<')[0].strip()
-                player_steam_id = columns[1].find('a').text.strip()
-                admin_name = columns[2].text.split('(<')[0].strip()
-                admin_steam_id = columns[2].find('a').text.strip()
-                evidence = ""
-                length = columns[3].text.strip()
-                reason = columns[4].text.strip()
-
-                if admin_steam_id == self.admin_steam_id:
-                    ban = Ban(date, player_name, player_steam_id, admin_name, admin_steam_id, evidence, length, reason)
-                    ban_list.append(ban)
+        for columns in extract_rows(content, self.parser_backend):
+            if len(columns) < 5 or columns[1][1] is None or columns[2][1] is None:
+                continue
+            date = columns[0][0].strip()
+            player_name = columns[1][0].split('(<')[0].strip()
+            player_steam_id = columns[1][1].strip()
+            admin_name = columns[2][0].split('(<')[0].strip()
+            admin_steam_id = columns[2][1].strip()
+            evidence = ""
+            length = columns[3][0].strip()
+            reason = columns[4][0].strip()
+            ban_list.append(Ban(date, player_name, player_steam_id, admin_name, admin_steam_id, evidence, length, reason, self.base_url))
 
+        SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - started, self.parser_backend or DEFAULT_BACKEND)
         return ban_list
 
+    def parse_bans(self, content):
+        return [ban for ban in self.parse_rows(content) if self.wanted(ban)]
+
+    def timed_fetch(self, page_num):
+        started = time.monotonic()
+        content = self.fetch_page(page_num)
+        return content, time.monotonic() - started
+
     def scrape_bans(self):
+        # Keeps up to `limit` pages in flight. The limit grows by one per window of fast pages and
+        # halves when a page fails, so a struggling ban site gets fewer concurrent requests.
+        # Each downloaded page is handed to the parse pool straight away, overlapping parsing with
+        # the downloads still in flight. Pages waiting to be parsed count against the limit too, so
+        # fast downloads can't run far past the end of the ban list before its empty page is parsed.
         ban_list = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(self.fetch_page, page_num) for page_num in range(1, self.max_pages + 1)]
+        limit = 2.0
+        next_page = 1
+        last_page = self.max_pages
+        fetching = {}
+        parsing = {}
+        self.job.update(pages_total=self.max_pages, pages_done=0, bans_found=0, concurrency=int(limit))
 
-            for future in as_completed(futures):
-                try:
-                    content = future.result()
-                    bans = self.parse_bans(content)
-                    ban_list.extend(bans)
-                except Exception as e:
-                    print(f"An error occurred: {e}")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, ThreadPoolExecutor(max_workers=PARSE_WORKERS) as parse_executor:
+            try:
+                while fetching or parsing or next_page <= last_page:
+                    self.job.check_cancelled()
+                    while next_page <= last_page and len(fetching) + len(parsing) < int(limit):
+                        fetching[executor.submit(self.timed_fetch, next_page)] = next_page
+                        next_page += 1
+
+                    done, _ = wait(list(fetching) + list(parsing), timeout=1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in fetching:
+                            page_num = fetching.pop(future)
+                            try:
+                                content, elapsed = future.result()
+                                parsing[parse_executor.submit(self.parse_rows, content or b'')] = page_num
+                                if elapsed > SLOW_PAGE_SECONDS:
+                                    limit = max(MIN_WORKERS, limit - 1)
+                                else:
+                                    limit = min(MAX_WORKERS, limit + 1 / int(limit))
+                                self.job.update(concurrency=int(limit))
+                                continue
+                            except Exception as e:
+                                limit = max(MIN_WORKERS, limit / 2)
+                                self.job.update(concurrency=int(limit))
+                                self.job.add_error(f"Page {page_num}: {e}")
+                        elif future in parsing:
+                            page_num = parsing.pop(future)
+                            try:
+                                rows = future.result()
+                                if not rows:
+                                    # Past the last page of bans; drop anything queued beyond it
+                                    last_page = min(last_page, page_num - 1)
+                                    self.job.update(pages_total=last_page)
+                                    for pending in (fetching, parsing):
+                                        for other, other_page in list(pending.items()):
+                                            if other_page > last_page:
+                                                other.cancel()
+                                                del pending[other]
+                                bans = [ban for ban in rows if self.wanted(ban)]
+                                ban_list.extend(bans)
+                                self.job.increment('bans_found', len(bans))
+                            except Exception as e:
+                                self.job.add_error(f"Page {page_num}: {e}")
+                        else:
+                            # Dropped above as past the last page
+                            continue
+                        if page_num <= last_page:
+                            self.job.increment('pages_done')
+            finally:
+                for future in list(fetching) + list(parsing):
+                    future.cancel()
 
         return ban_list
 
+    def scrape_new_bans(self, database):
+        # Walks the newest-first ban list until it reaches bans stored by a previous scrape,
+        # then inserts what it found and records the new high-water mark and page validators.
+        high_water_name = self.state_name('high_water', self.base_url)
+        high_water = database.get_state(high_water_name)
+        high_water = tuple(json.loads(high_water)) if high_water else None
+        new_high_water = None
+        ban_list = []
+
+        self.job.update(pages_total=self.max_pages, pages_done=0, bans_found=0, concurrency=1)
+        for page_num in range(1, self.max_pages + 1):
+            self.job.check_cancelled()
+            page_url = self.page_url(page_num)
+            validators = database.get_state(self.state_name('validators', page_url))
+            content = self.fetch_page(page_num, json.loads(validators) if validators else None)
+            if content is None:
+                break
+            rows = self.parse_rows(content)
+            if not rows:
+                break
+            if new_high_water is None:
+                new_high_water = ban_key(rows[0])
+
+            bans = [ban for ban in rows if self.wanted(ban)]
+            known = database.known_keys(bans)
+            new_bans = [ban for ban in bans if ban_key(ban) not in known]
+            ban_list.extend(new_bans)
+            self.job.increment('pages_done')
+            self.job.increment('bans_found', len(new_bans))
+            reached_high_water = high_water is not None and high_water in {ban_key(ban) for ban in rows}
+            if reached_high_water or (bans and not new_bans):
+                break
+
+        self.job.check_cancelled()
+        inserted = database.insert_bans(ban_list)
+        self.job.increment('bans_stored', inserted)
+        state = {self.state_name('validators', page_url): json.dumps(validators) for page_url, validators in self.validators.items()}
+        if new_high_water is not None:
+            state[high_water_name] = json.dumps(new_high_water)
+        database.set_state(state)
+        print(f"Stored {inserted} new bans")
+        return ban_list
+
 class BanDatabase:
-    def __init__(self, db_name='bans.db'):
+    def __init__(self, db_name='bans.db', create=True):
         self.db_name = db_name
-        self.create_table()
+        self.pool = get_pool(db_name)
+        if create:
+            self.create_table()
 
     def create_table(self):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
+            if schema_current(conn, BAN_MIGRATIONS):
+                return
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS bans (
@@ -91,43 +287,63 @@ class BanDatabase:
                 )
             ''')
             conn.commit()
+            migrate(conn, BAN_MIGRATIONS)
 
     def insert_bans(self, bans):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            cursor.executemany('''
-                INSERT INTO bans (date, player_name, player_steam_id, admin_name, admin_steam_id, length, reason, evidence)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [(ban.date, ban.player_name, ban.player_steam_id, ban.admin_name, ban.admin_steam_id, ban.length, ban.reason, ban.evidence) for ban in bans])
+            cursor.executemany(INSERT_BAN, [ban_values(ban) for ban in bans if not ban.evidence])
+            inserted = max(cursor.rowcount, 0)
+            for ban in bans:
+                if ban.evidence:
+                    cursor.execute(INSERT_BAN, ban_values(ban))
+                    if cursor.rowcount:
+                        store_evidence(cursor, 'ban_evidence', 'ban_id', cursor.lastrowid, ban.evidence)
+                        inserted += 1
             conn.commit()
+            return inserted
 
     def insert_ban(self, ban):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO bans (date, player_name, player_steam_id, admin_name, admin_steam_id, length, reason, evidence)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (ban.date, ban.player_name, ban.player_steam_id, ban.admin_name, ban.admin_steam_id, ban.length, ban.reason, ban.evidence))
+            cursor.execute(INSERT_MANUAL_BAN, ban_values(ban))
+            store_evidence(cursor, 'ban_evidence', 'ban_id', cursor.lastrowid, ban.evidence)
             conn.commit()
 
+    def known_keys(self, bans):
+        # site != '' repeats the unique index's condition, which SQLite needs before it will use that partial index
+        with self.pool.connection() as conn:
+            return {ban_key(ban) for ban in bans
+                    if conn.execute("SELECT 1 FROM bans WHERE date = ? AND player_steam_id = ? AND admin_steam_id = ? AND reason = ? AND site = ? AND site != ''", ban_key(ban)).fetchone()}
+
+    def get_state(self, name):
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT value FROM scrape_state WHERE name = ?', (name,)).fetchone()
+            return row[0] if row else None
+
+    def set_state(self, values):
+        with self.pool.connection() as conn:
+            conn.executemany('INSERT INTO scrape_state (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = excluded.value',
+                             list(values.items()))
+
     def get_all_bans(self):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM bans')
+            cursor.execute(f'SELECT {BAN_COLUMNS} FROM bans')
             rows = cursor.fetchall()
-            return [Ban(*row[1:]) for row in rows]  # Skips the id field
+            return [Ban(*row) for row in rows]
 
     def get_ban_by_id(self, ban_id):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM bans WHERE id = ?', (ban_id,))
+            cursor.execute(f'SELECT {BAN_COLUMNS} FROM bans WHERE id = ?', (ban_id,))
             row = cursor.fetchone()
             if row:
-                return Ban(*row[1:])  # Skips the id field
+                return Ban(*row)
             return None
 
     def delete_ban(self, ban_id):
-        with sqlite3.connect(self.db_name) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM bans WHERE id = ?', (ban_id,))
             conn.commit()
@@ -0,0 +1,243 @@
+import argparse
+import csv
+import html
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bans import Ban, BanDatabase, INSERT_BAN, ban_values
+from database import deferred_fts_index, get_pool, migrate, REPORT_MIGRATIONS
+from jobs import Job
+from csvimport import import_reports
+from reasons import STANDARD_REASONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BAN_FTS_COLUMNS = ['player_name', 'admin_name', 'reason']
+BAN_BATCH_SIZE = 10000
+# Roughly one distinct player per this many rows; Zipf weights make a few of them very frequent
+ROWS_PER_PLAYER = 20
+ZIPF_EXPONENT = 1.1
+
+FIRST_PARTS = ['Dark', 'Shadow', 'Lil', 'Big', 'Mr', 'Sir', 'xX', 'The', 'Sgt', 'Captain', 'Officer', 'Dank', 'Crazy',
+               'Silent', 'Toxic', 'Frosty', 'Lucky', 'Sneaky', 'Angry', 'Happy', 'Pro', 'Noob', 'King', 'Saint']
+LAST_PARTS = ['Wolf', 'Gamer', 'Sniper', 'Tiger', 'Ghost', 'Bandit', 'Thief', 'Hobo', 'Mayor', 'Cop', 'Medic', 'Chef',
+              'Dealer', 'Raider', 'Builder', 'Ninja', 'Pickle', 'Potato', 'Falcon', 'Viking', 'Memer', 'Slayer', 'Nyx']
+JOBS = ['Thief', 'Hobo', 'Police Officer', 'Mayor', 'Gun Dealer', 'Medic', 'Citizen', 'Gangster', 'Mob Boss', 'Chief']
+ACCENTED = ['José', 'Zoë', 'Björn', 'Łukasz', 'Søren', 'Иван', '鈴木', 'Chloé']
+ADMINS = ['Admin Kai', 'Moderator Vex', 'SuperAdmin Rook', 'Trial Mod Juno', 'Admin Pike', 'Senior Mod Orla', 'Owner Garnet']
+
+LEGACY_REASONS = ['ARDM & RDM', 'RDM & NLR', 'Mass RDM', 'FailRP & Propblock']
+OTHER_DETAILS = ['mic spam', 'spawn killing', 'exploiting', 'disrespecting staff', 'door camping', 'metagaming']
+BAN_REASONS = ['RDM', 'Mass RDM', 'NLR', 'FailRP', 'Propblock', 'Cheating', 'Mic spam', 'Racism', 'Advertising',
+               'Exploiting', 'Ban evasion', 'Staff disrespect', 'Prop minge', 'Multiple RDM after warning']
+# (weight, punishment) pairs; a few deliberately use units durations.py doesn't know
+PUNISHMENTS = [(20, 'Verbal warning'), (15, '4 min jail'), (10, '8 min jail'), (5, '15 min jail'), (8, 'Kick'),
+               (6, '1 Day Ban'), (5, '3 Day Ban'), (6, '1 Week Ban'), (6, '2 Week Ban'), (3, '1 Month Ban'),
+               (1, '6 Month Ban'), (2, 'Permanent Ban'), (3, '3 day propban'), (2, '12 Hour Ban'), (1, '2 fortnight ban'),
+               (4, 'No action'), (3, 'Warn')]
+BAN_LENGTHS = [(15, '12 Hours'), (20, '1 Day'), (15, '3 Days'), (15, '1 Week'), (10, '2 Weeks'), (8, '1 Month'),
+               (3, '6 Months'), (1, '1 Year'), (8, 'Permanent')]
+
+PAGE_HEADER = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>Bans | Garnet Gaming DarkRP</title>
+</head>
+<body>
+    <div class="container">
+        <h1>DarkRP Bans</h1>
+        <table class="table table-striped">
+            <tr>
+                <th>Date</th>
+                <th>Player</th>
+                <th>Admin</th>
+                <th>Length</th>
+                <th>Reason</th>
+            </tr>
+'''
+PAGE_ROW = '''            <tr class="ban-row">
+                <td class="ban-date">{date}</td>
+                <td><span class="player">{player}</span> (&lt;<a href="https://steamcommunity.com/profiles/{player_id}" target="_blank">{player_id}</a>&gt;)</td>
+                <td><span class="admin">{admin}</span> (&lt;<a href="https://steamcommunity.com/profiles/{admin_id}" target="_blank">{admin_id}</a>&gt;)</td>
+                <td>{length}</td>
+                <td>{reason}</td>
+            </tr>
+'''
+PAGE_FOOTER = '''        </table>
+    </div>
+</body>
+</html>
+'''
+
+def weighted(pairs):
+    weights, values = zip(*pairs)
+    return list(values), list(itertools.accumulate(weights))
+
+class Players:
+    # A pool of distinct players; choose() picks with Zipf-distributed frequency like real report logs
+    def __init__(self, rng, count):
+        self.rng = rng
+        self.names = []
+        self.steam_ids = []
+        seen = set()
+        while len(self.names) < count:
+            name = self.make_name()
+            if name.casefold() in seen:
+                continue
+            seen.add(name.casefold())
+            self.names.append(name)
+            self.steam_ids.append(f'STEAM_0:{rng.randint(0, 1)}:{rng.randint(10000000, 99999999)}')
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, count + 1)))
+        self.indexes = range(count)
+
+    def make_name(self):
+        rng = self.rng
+        roll = rng.random()
+        if roll < 0.5:
+            name = rng.choice(FIRST_PARTS) + rng.choice(LAST_PARTS)
+        elif roll < 0.75:
+            name = f'{rng.choice(FIRST_PARTS)} {rng.choice(LAST_PARTS)}'
+        elif roll < 0.8:
+            name = rng.choice(ACCENTED) + rng.choice(LAST_PARTS)
+        else:
+            name = rng.choice(LAST_PARTS).lower() + rng.choice(['', '_', 'x'])
+        if rng.random() < 0.6:
+            name += str(rng.randint(1, 9999))
+        if rng.random() < 0.15:
+            name += f' ({rng.choice(JOBS)})'
+        return name
+
+    def choose(self):
+        index = self.rng.choices(self.indexes, cum_weights=self.cum_weights)[0]
+        return self.names[index], self.steam_ids[index]
+
+def random_dates(rng, count, months):
+    # Ascending timestamps spread over the last `months` months, at minute resolution like the spreadsheets
+    end = datetime.now().replace(second=0, microsecond=0)
+    start = end - timedelta(days=30 * months)
+    span = int((end - start).total_seconds() // 60)
+    offsets = sorted(rng.randrange(span) for _ in range(count))
+    return (start + timedelta(minutes=offset) for offset in offsets)
+
+def report_reason(rng):
+    roll = rng.random()
+    if roll < 0.05:
+        return rng.choice(LEGACY_REASONS)
+    if roll < 0.12:
+        return f'Other, {rng.choice(OTHER_DETAILS)}'
+    reasons = rng.sample(STANDARD_REASONS[:-2], 2 if roll > 0.85 else 1)
+    return ', '.join(reasons)
+
+def report_evidence(rng, reporter, reportee, date_time):
+    roll = rng.random()
+    if roll < 0.3:
+        return ''
+    clip = f"{reportee.split(' (')[0]}{reporter.split(' (')[0]}{date_time.strftime('%Y%m%d%H%M%S')}.mp4".replace(' ', '')
+    items = [f"{date_time.strftime('%Y-%m')}/{clip}"]
+    if roll > 0.85:
+        items.append(f'https://medal.tv/clips/{rng.randrange(10 ** 8, 10 ** 9)}')
+    return ', '.join(items)
+
+def write_reports_csv(path, rng, players, count, months):
+    punishments, punishment_weights = weighted(PUNISHMENTS)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for date_time in random_dates(rng, count, months):
+            reporter = players.choose()[0]
+            reportee = players.choose()[0]
+            writer.writerow([date_time.strftime('%m/%d/%Y %I:%M %p'), reporter, reportee,
+                             report_reason(rng), report_evidence(rng, reporter, reportee, date_time),
+                             rng.choices(punishments, cum_weights=punishment_weights)[0]])
+
+def generate_bans(rng, players, count, months):
+    lengths, length_weights = weighted(BAN_LENGTHS)
+    admins = [(name, f'STEAM_0:0:{rng.randint(10000000, 99999999)}') for name in ADMINS]
+    for date_time in random_dates(rng, count, months):
+        player_name, player_steam_id = players.choose()
+        admin_name, admin_steam_id = rng.choice(admins)
+        yield Ban((date_time + timedelta(seconds=rng.randrange(60))).strftime('%Y-%m-%d %H:%M:%S'), player_name, player_steam_id, admin_name, admin_steam_id, '',
+                  rng.choices(lengths, cum_weights=length_weights)[0], rng.choice(BAN_REASONS))
+
+def create_reports_db(path, csv_path):
+    pool = get_pool(path)
+    with pool.connection() as conn:
+        with open(os.path.join(ROOT, 'schema.sql')) as file:
+            conn.executescript(file.read())
+        migrate(conn, REPORT_MIGRATIONS)
+    return import_reports(Job('generate'), pool, csv_path)
+
+def create_bans_db(path, bans):
+    database = BanDatabase(path)
+    with database.pool.connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        start_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM bans').fetchone()[0]
+        with deferred_fts_index(conn, 'bans', BAN_FTS_COLUMNS, start_id):
+            while True:
+                batch = list(itertools.islice(bans, BAN_BATCH_SIZE))
+                if not batch:
+                    break
+                conn.executemany(INSERT_BAN, [ban_values(ban) for ban in batch])
+    with database.pool.connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM bans').fetchone()[0]
+
+def write_ban_pages(directory, bans_path, pages, rows_per_page):
+    # Newest first, like the live site
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(bans_path)
+    rows = conn.execute('SELECT date, player_name, player_steam_id, admin_name, admin_steam_id, length, reason FROM bans ORDER BY date DESC LIMIT ?',
+                        (pages * rows_per_page,)).fetchall()
+    conn.close()
+    for page_num in range(1, pages + 1):
+        page_rows = rows[(page_num - 1) * rows_per_page:page_num * rows_per_page]
+        with open(os.path.join(directory, f'bans_page_{page_num}.html'), 'w', encoding='utf-8') as file:
+            file.write(PAGE_HEADER)
+            for date, player, player_id, admin, admin_id, length, reason in page_rows:
+                file.write(PAGE_ROW.format(date=date, player=html.escape(player), player_id=player_id, admin=html.escape(admin),
+                                           admin_id=admin_id, length=html.escape(length), reason=html.escape(reason)))
+            file.write(PAGE_FOOTER)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic reports.db/bans.db datasets for benchmarking.')
+    parser.add_argument('output', help='directory to write reports.db, bans.db, reports.csv and ban page fixtures into')
+    parser.add_argument('--reports', type=int, default=100000)
+    parser.add_argument('--bans', type=int, default=100000)
+    parser.add_argument('--months', type=int, default=24, help='spread rows over this many months back from today')
+    parser.add_argument('--pages', type=int, default=20, help='ban page HTML fixtures to write')
+    parser.add_argument('--rows-per-page', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    for name in ('reports.db', 'bans.db'):
+        for suffix in ('', '-wal', '-shm'):
+            path = os.path.join(args.output, name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    rng = random.Random(args.seed)
+    players = Players(rng, max(50, (args.reports + args.bans) // ROWS_PER_PLAYER))
+
+    started = time.perf_counter()
+    csv_path = os.path.join(args.output, 'reports.csv')
+    write_reports_csv(csv_path, rng, players, args.reports, args.months)
+    counts = create_reports_db(os.path.join(args.output, 'reports.db'), csv_path)
+    print(f"reports.db: {counts['imported']} reports ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    bans_path = os.path.join(args.output, 'bans.db')
+    stored = create_bans_db(bans_path, generate_bans(rng, players, args.bans, args.months))
+    print(f"bans.db: {stored} bans ({time.perf_counter() - started:.1f}s)")
+
+    if args.pages:
+        write_ban_pages(os.path.join(args.output, 'fixtures'), bans_path, args.pages, args.rows_per_page)
+        print(f"Wrote {args.pages} ban page fixtures")
+
+if __name__ == '__main__':
+    main()
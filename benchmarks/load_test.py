@@ -0,0 +1,148 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from run_bench import ROOT, copy_database, git_commit
+
+def popular_names(reports_db, count=50):
+    conn = sqlite3.connect(reports_db)
+    names = [row[0] for row in conn.execute('SELECT label FROM report_stats_reportee ORDER BY count DESC LIMIT ?', (count,))]
+    conn.close()
+    return names or ['player']
+
+def request_paths(names, client, number):
+    # A mix of listing, search, stats and autocomplete requests. The `_` argument makes each search and
+    # listing URL unique, so the response cache can't answer it and the workers do the real query work.
+    name = names[number % len(names)]
+    unique = f'{client}-{number}'
+    return [
+        f'/api/v1/reports?search_query={quote(name)}&_={unique}',
+        f'/api/v1/reports?deep_storage=false&_={unique}',
+        f'/api/v1/bans?_={unique}',
+        '/stats',
+        f'/autocomplete?query={quote(name[:3])}',
+    ][number % 5]
+
+def run_client(port, names, client, duration):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    number = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        path = request_paths(names, client, number)
+        number += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return latencies, errors
+
+def wait_healthy(port, process, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/healthz')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError('server did not become ready')
+
+def run_level(work, port, workers, threads, clients, duration, names):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py'), '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', str(workers), '--threads', str(threads)],
+                               cwd=work, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_healthy(port, process)
+        # Each worker loads its own name index; give them a moment before measuring
+        time.sleep(1)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.starmap(run_client, [(port, names, client, duration) for client in range(clients)])
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+    if not latencies:
+        raise RuntimeError(f"no successful requests with {workers} workers ({errors} errors)")
+    return {
+        'workers': workers,
+        'threads': threads,
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(latencies[len(latencies) // 2], 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure serve.py throughput at several worker counts against a generated dataset.')
+    parser.add_argument('data', help='directory written by generate_data.py')
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts to try')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per worker count')
+    parser.add_argument('--port', type=int, default=4300)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data)
+    work = tempfile.mkdtemp(prefix='gmod-load-')
+    results = []
+    try:
+        for name in ('reports.db', 'bans.db'):
+            copy_database(os.path.join(data_dir, name), os.path.join(work, name))
+        names = popular_names(os.path.join(work, 'reports.db'))
+        for workers in [int(value) for value in args.workers.split(',')]:
+            result = run_level(work, args.port, workers, args.threads, args.clients, args.duration, names)
+            results.append(result)
+            print(f"{workers:>3} workers x {args.threads} threads: {result['requests_per_second']:8.1f} req/s, "
+                  f"p50 {result['p50_ms']:8.2f} ms, p95 {result['p95_ms']:8.2f} ms, {result['errors']} errors")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'duration_s': args.duration,
+                },
+                'results': results,
+            }, file, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banparse import BACKENDS
+from bans import BanScraper, get_session
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BANS_URL = "https://garnetgaming.net/darkrp/bans"
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+def soup_rows(content):
+    # The tree-building parser the scraper used before banparse, kept as a baseline
+    ban_list = []
+    for ban_entry in BeautifulSoup(content, 'html.parser').find_all('tr')[1:]:
+        columns = ban_entry.find_all('td')
+        if len(columns) > 0:
+            ban_list.append((columns[0].text.strip(), columns[1].text.split('(<')[0].strip(), columns[1].find('a').text.strip(),
+                             columns[2].text.split('(<')[0].strip(), columns[2].find('a').text.strip(),
+                             columns[3].text.strip(), columns[4].text.strip()))
+    return ban_list
+
+def backend_rows(backend):
+    scraper = BanScraper(BANS_URL, None, parser_backend=backend)
+    def parse(content):
+        return [(ban.date, ban.player_name, ban.player_steam_id, ban.admin_name, ban.admin_steam_id, ban.length, ban.reason)
+                for ban in scraper.parse_rows(content)]
+    return parse
+
+def save_pages(count):
+    os.makedirs(FIXTURES, exist_ok=True)
+    for page_num in range(1, count + 1):
+        response = get_session().get(f"{BANS_URL}/index.php?page={page_num}", timeout=20)
+        response.raise_for_status()
+        with open(os.path.join(FIXTURES, f'saved_page_{page_num}.html'), 'wb') as file:
+            file.write(response.content)
+        print(f"Saved page {page_num}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Time ban page parsing over saved HTML pages.')
+    parser.add_argument('pages', nargs='*', help='HTML files to parse (default: benchmarks/fixtures/*.html)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--save', type=int, metavar='N', help='download the first N live ban pages into the fixtures folder first')
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save)
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURES, '*.html')))
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            pages.append(file.read())
+    if not pages:
+        print("No HTML pages to parse")
+        return
+
+    parsers = {name: backend_rows(name) for name in BACKENDS}
+    if BeautifulSoup is not None:
+        parsers['beautifulsoup'] = soup_rows
+
+    expected = None
+    for name, parse in parsers.items():
+        results = [parse(content) for content in pages]
+        if expected is None:
+            expected = results
+        elif results != expected:
+            print(f"{name}: rows differ from {next(iter(parsers))}")
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for content in pages:
+                parse(content)
+        elapsed = time.perf_counter() - started
+        per_page = elapsed * 1000 / (args.repeat * len(pages))
+        print(f"{name:>14}: {per_page:7.2f} ms/page, {sum(len(rows) for rows in results) / len(pages):.0f} rows/page")
+
+if __name__ == '__main__':
+    main()
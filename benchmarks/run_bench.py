@@ -0,0 +1,226 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+def copy_database(source, destination):
+    # The backup API gives a consistent copy even if the source still has a -wal file next to it
+    source_conn = sqlite3.connect(source)
+    destination_conn = sqlite3.connect(destination)
+    source_conn.backup(destination_conn)
+    destination_conn.close()
+    source_conn.close()
+
+def summarize(runs):
+    ordered = sorted(runs)
+    return {
+        'runs': len(runs),
+        'median_ms': round(statistics.median(ordered), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+def measure(function, repeat, warmup=1):
+    for _ in range(warmup):
+        function()
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        runs.append((time.perf_counter() - started) * 1000)
+    return runs
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def route_benchmarks(app_module, client, reports_db):
+    conn = sqlite3.connect(reports_db)
+    popular = conn.execute('SELECT label FROM report_stats_reportee ORDER BY count DESC LIMIT 1').fetchone()[0]
+    busiest_month = conn.execute('SELECT label FROM report_stats_month ORDER BY count DESC LIMIT 1').fetchone()[0]
+    conn.close()
+
+    def route(url, cached=False):
+        def run():
+            if not cached:
+                app_module.RESPONSE_CACHE.invalidate()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+            response.get_data()
+            response.close()
+        return run
+
+    month_args = f'deep_storage=true&selected_month={busiest_month}'
+    return [
+        ('GET /', route('/')),
+        ('GET /api/v1/reports (current month)', route('/api/v1/reports?deep_storage=false')),
+        ('GET /api/v1/reports (busiest month)', route(f'/api/v1/reports?{month_args}')),
+        ('GET /api/v1/reports (search, all months)', route(f'/api/v1/reports?search_query={quote(popular)}')),
+        ('GET /api/v1/reports (reason filter)', route(f'/api/v1/reports?{month_args}&search_field=report_reason&search_query=RDM')),
+        ('GET /bans', route('/bans')),
+        ('GET /api/v1/bans', route('/api/v1/bans')),
+        ('GET /api/v1/bans (search)', route('/api/v1/bans?search_query=RDM')),
+        ('GET /stats', route('/stats')),
+        ('GET /stats (cached)', route('/stats', cached=True)),
+        ('GET /search_user', route(f'/search_user?username={quote(popular)}')),
+        ('GET /autocomplete', route(f'/autocomplete?query={quote(popular[:3])}')),
+        ('GET /export_reports (all)', route('/export_reports')),
+        ('GET /export_reports (gzip)', route('/export_reports?gzip=1')),
+    ]
+
+def import_benchmarks(work, data_dir, import_rows):
+    from csvimport import import_reports
+    from database import REPORT_MIGRATIONS, get_pool, migrate
+    from jobs import Job
+
+    csv_path = os.path.join(work, 'import.csv')
+    with open(os.path.join(data_dir, 'reports.csv'), encoding='utf-8') as source, open(csv_path, 'w', encoding='utf-8') as destination:
+        for line_number, line in enumerate(source):
+            if line_number >= import_rows:
+                break
+            destination.write(line)
+
+    with open(os.path.join(ROOT, 'schema.sql')) as file:
+        schema = file.read()
+    counter = [0]
+
+    def fresh_pool():
+        counter[0] += 1
+        pool = get_pool(os.path.join(work, f'import_{counter[0]}.db'))
+        with pool.connection() as conn:
+            conn.executescript(schema)
+            migrate(conn, REPORT_MIGRATIONS)
+        return pool
+
+    duplicate_pool = fresh_pool()
+    import_reports(Job('bench'), duplicate_pool, csv_path)
+
+    def cold():
+        pool = fresh_pool()
+        import_reports(Job('bench'), pool, csv_path)
+
+    def duplicates():
+        import_reports(Job('bench'), duplicate_pool, csv_path)
+
+    return [
+        (f'CSV import ({import_rows} rows, empty db)', cold),
+        (f'CSV import ({import_rows} rows, all duplicates)', duplicates),
+    ]
+
+def parse_benchmarks(data_dir):
+    from bans import BanScraper
+    paths = sorted(glob.glob(os.path.join(data_dir, 'fixtures', '*.html'))) or sorted(glob.glob(os.path.join(FIXTURES, '*.html')))
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            pages.append(file.read())
+    scraper = BanScraper('https://example.invalid/bans', None)
+
+    def parse():
+        for content in pages:
+            scraper.parse_rows(content)
+
+    return [(f'BanScraper.parse_rows ({len(pages)} pages)', parse)] if pages else []
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit')}):")
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"{name:>55}: new")
+            continue
+        change = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100 if previous['median_ms'] else 0
+        print(f"{name:>55}: {previous['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the main routes, CSV import and ban parsing against a generated dataset.')
+    parser.add_argument('data', help='directory written by generate_data.py')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--import-repeat', type=int, default=3)
+    parser.add_argument('--import-rows', type=int, default=20000)
+    parser.add_argument('--only', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare medians with an earlier --output file')
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data)
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    previous_dir = os.getcwd()
+    work = tempfile.mkdtemp(prefix='gmod-bench-')
+    try:
+        for name in ('reports.db', 'bans.db'):
+            copy_database(os.path.join(data_dir, name), os.path.join(work, name))
+        # app.py opens reports.db/bans.db relative to the working directory
+        os.chdir(work)
+        started = time.perf_counter()
+        import app as app_module
+        app_module.create_app()
+        startup_ms = (time.perf_counter() - started) * 1000
+        app_module.NAME_INDEX.loaded.wait()
+        client = app_module.app.test_client()
+
+        with sqlite3.connect('reports.db') as conn:
+            report_count = conn.execute('SELECT COUNT(*) FROM report').fetchone()[0]
+        with sqlite3.connect('bans.db') as conn:
+            ban_count = conn.execute('SELECT COUNT(*) FROM bans').fetchone()[0]
+
+        benchmarks = [(name, function, args.repeat) for name, function in route_benchmarks(app_module, client, 'reports.db')]
+        benchmarks += [(name, function, args.import_repeat) for name, function in import_benchmarks(work, data_dir, args.import_rows)]
+        benchmarks += [(name, function, args.repeat) for name, function in parse_benchmarks(data_dir)]
+
+        results = {}
+        for name, function, repeat in benchmarks:
+            if args.only and args.only not in name:
+                continue
+            results[name] = summarize(measure(function, repeat))
+            result = results[name]
+            print(f"{name:>55}: median {result['median_ms']:10.2f} ms, p95 {result['p95_ms']:10.2f} ms")
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work, ignore_errors=True)
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'reports': report_count,
+            'bans': ban_count,
+            'app_import_ms': round(startup_ms, 3),
+        },
+        'results': results,
+    }
+    if output_path:
+        with open(output_path, 'w') as file:
+            json.dump(output, file, indent=2)
+        print(f"Wrote {output_path}")
+    if baseline_path:
+        compare(results, baseline_path)
+
+if __name__ == '__main__':
+    main()
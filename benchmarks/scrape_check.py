@@ -0,0 +1,128 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bans import MAX_WORKERS, BanDatabase, BanScraper
+from generate_data import PAGE_FOOTER, PAGE_HEADER
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+FIRST_ROW = re.compile(rb'<tr class="ban-row">.*?</tr>\s*', re.S)
+BAN_DATE = re.compile(rb'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+
+class FixtureSite:
+    # Serves saved ban pages as /bans/index.php?page=N, newest first like the live site, with an ETag
+    # per page. Pages past the saved ones are an empty ban table.
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.empty = (PAGE_HEADER + PAGE_FOOTER).encode()
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def page(self, page_num):
+        return self.pages[page_num - 1] if 1 <= page_num <= len(self.pages) else self.empty
+
+    def add_ban(self):
+        # A new ban on top of page 1: a copy of its first row with a later date
+        row = FIRST_ROW.search(self.pages[0]).group(0)
+        self.pages[0] = self.pages[0].replace(row, BAN_DATE.sub(b'2099-01-01 00:00:00', row, count=1) + row, 1)
+
+    def reset(self):
+        with self.lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+def handler_for(site):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/bans/index.php':
+                self.send_error(404)
+                return
+            page_num = int(parse_qs(url.query).get('page', ['1'])[0])
+            content = site.page(page_num)
+            etag = '"%s"' % hashlib.md5(content).hexdigest()
+            not_modified = self.headers.get('If-None-Match') == etag
+            with site.lock:
+                site.requests.append((page_num, 304 if not_modified else 200))
+            if not_modified:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+    return FixtureHandler
+
+def check(name, passed, detail):
+    print(f"{'ok  ' if passed else 'FAIL'} {name}: {detail}")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the ban scraper against saved ban pages served over local HTTP.')
+    parser.add_argument('fixtures', nargs='?', default=FIXTURES, help='folder of bans_page_N.html files (default: benchmarks/fixtures)')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, 'bans_page_*.html')), key=lambda path: int(re.search(r'(\d+)\.html$', path).group(1)))
+    if not paths:
+        print(f"No bans_page_N.html files in {args.fixtures}")
+        return 1
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            pages.append(file.read())
+
+    site = FixtureSite(pages)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_for(site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bans"
+    workdir = tempfile.mkdtemp(prefix='scrape-check-')
+    results = []
+    try:
+        database = BanDatabase(os.path.join(workdir, 'bans.db'))
+        last_page = len(pages)
+
+        bans = BanScraper(base_url, max_pages=last_page + 30).scrape_bans()
+        fetched = sorted(page_num for page_num, _ in site.reset())
+        results.append(check('full scrape', max(fetched) <= last_page + MAX_WORKERS and len(set(fetched)) == len(fetched),
+                             f"{len(bans)} bans, fetched {len(fetched)} pages for {last_page} (highest {max(fetched)})"))
+
+        stored = len(BanScraper(base_url, max_pages=last_page + 30).scrape_new_bans(database))
+        fetched = [page_num for page_num, _ in site.reset()]
+        results.append(check('first incremental run', stored > 0 and fetched == list(range(1, last_page + 2)),
+                             f"stored {stored} bans, fetched pages {fetched}"))
+
+        stored = len(BanScraper(base_url, max_pages=last_page + 30).scrape_new_bans(database))
+        requests = site.reset()
+        results.append(check('second incremental run', stored == 0 and requests == [(1, 304)],
+                             f"stored {stored} bans, requests {requests}"))
+
+        site.add_ban()
+        stored = len(BanScraper(base_url, max_pages=last_page + 30).scrape_new_bans(database))
+        requests = site.reset()
+        results.append(check('one new ban', stored == 1 and requests == [(1, 200)],
+                             f"stored {stored} bans, requests {requests}"))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if all(results) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import platform
+import shlex
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from run_bench import ROOT, compare, copy_database, git_commit, summarize
+
+HEALTH_URL = 'http://127.0.0.1:4200/healthz'
+IMPORT_SNIPPET = 'import time; started = time.perf_counter(); import app; app.create_app(); print((time.perf_counter() - started) * 1000)'
+
+def wait_healthy(process, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode} before becoming ready")
+        try:
+            with urllib.request.urlopen(HEALTH_URL, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except urllib.error.HTTPError:
+            # Any HTTP answer means the server is up; builds from before /healthz return 404 here
+            return
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"server was not ready within {timeout} s")
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def prepare(work, data_dir):
+    # A fresh directory per run; without a dataset the server starts on empty databases and creates the schema
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+    if data_dir:
+        for name in ('reports.db', 'bans.db'):
+            copy_database(os.path.join(data_dir, name), os.path.join(work, name))
+
+def time_until_ready(command, work, data_dir, timeout):
+    prepare(work, data_dir)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=work, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_healthy(process, timeout)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        stop(process)
+
+def time_import(work, data_dir):
+    prepare(work, data_dir)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], cwd=work, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Time backend startup: importing app.py, and process spawn until /healthz answers.')
+    parser.add_argument('data', nargs='?', help='directory written by generate_data.py; omitted means empty databases')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--command', help='server command to time instead of "python app.py", e.g. the packaged server.exe')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare medians with an earlier --output file')
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data) if args.data else None
+    command = shlex.split(args.command) if args.command else [sys.executable, os.path.join(ROOT, 'app.py')]
+    work = os.path.join(tempfile.mkdtemp(prefix='gmod-startup-'), 'run')
+    results = {}
+    try:
+        runs = {'spawn until /healthz': [], 'import app': []}
+        for _ in range(args.repeat):
+            runs['spawn until /healthz'].append(time_until_ready(command, work, data_dir, args.timeout))
+            if not args.command:
+                runs['import app'].append(time_import(work, data_dir))
+        for name, values in runs.items():
+            if values:
+                results[name] = summarize(values)
+                print(f"{name:>30}: median {results[name]['median_ms']:10.2f} ms, max {results[name]['max_ms']:10.2f} ms")
+    finally:
+        shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'command': ' '.join(command),
+            'data': data_dir,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(output, file, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -6,3 +6,16 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or '66dc54f8-db38-8000-bc1a-2eaaa3439bf2'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'reports.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Rendered /, /bans and /stats pages kept for repeat navigation
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    RESPONSE_CACHE_MAX_AGE = 60
+    # Statements slower than this are printed with their EXPLAIN QUERY PLAN and listed at /metrics/slow_queries
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    # When set, requests with ?profile=1 (or an X-Profile header) are run under cProfile and dumped here
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    # Seconds between background scans of the evidence folder; 0 turns periodic scans off
+    EVIDENCE_INDEX_SECONDS = int(os.environ.get('EVIDENCE_INDEX_SECONDS', 600))
+    # Attach newly found recordings to the one report they unambiguously belong to
+    EVIDENCE_AUTO_LINK = os.environ.get('EVIDENCE_AUTO_LINK', '1') != '0'
+    # IANA timezone the ban sites list dates in (e.g. America/New_York); unset means the server's local time
+    BAN_SITE_TIMEZONE = os.environ.get('BAN_SITE_TIMEZONE')
@@ -0,0 +1,52 @@
+import json
+import os
+import threading
+from locks import FileLock
+
+class ConfigFile:
+    # config.json, shared by every worker process and by Electron's main.js. Reads come from memory
+    # until the file's mtime or size changes, so a setting saved in one worker shows up in the others.
+    # Updates re-read the file under a file lock, so concurrent writers don't drop each other's keys.
+    def __init__(self, path):
+        self.path = path
+        self.write_lock = FileLock(path + '.lock')
+        self.lock = threading.Lock()
+        self.signature = None
+        self.values = {}
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as file:
+            return json.load(file)
+
+    def read(self):
+        signature = self.file_signature()
+        with self.lock:
+            if signature != self.signature:
+                try:
+                    self.values = self.load()
+                    self.signature = signature
+                except ValueError:
+                    # Caught mid-write (main.js doesn't take the lock); keep the last good copy and retry next time
+                    pass
+            return dict(self.values)
+
+    def get(self, key, default=None):
+        return self.read().get(key, default)
+
+    def update(self, **values):
+        with self.write_lock:
+            config = self.load()
+            config.update(values)
+            # Written in place rather than renamed over, so main.js's fs.watch on the file keeps firing
+            with open(self.path, 'w') as file:
+                json.dump(config, file, indent=4)
+        return config
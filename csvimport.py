@@ -0,0 +1,150 @@
+import csv
+import os
+import tempfile
+from datetime import datetime
+from database import REPORT_FTS_COLUMNS, deferred_fts_index
+from durations import BAN_DATE_FORMATS, format_timestamp, report_epoch, report_expiry
+from evidence import evidence_rows, insert_evidence
+from names import name_key
+from reasons import insert_report_reasons
+from reportstats import deferred_report_stats
+
+BATCH_SIZE = 5000
+# Stays under SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+MAX_QUERY_PARAMS = 900
+DATE_CACHE_SIZE = 100000
+# The exported spreadsheet format comes first; the rest cover other teams' sheets
+IMPORT_DATE_FORMATS = ['%m/%d/%Y %I:%M %p'] + BAN_DATE_FORMATS
+
+INSERT_REPORT = '''
+    INSERT INTO report (date_time, reporter, reportee, report_reason, evidence, punishment, reporter_key, reportee_key, expires_at, date_time_epoch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+class DateParser:
+    # Spreadsheets repeat the same minute-resolution timestamps and stick to one format,
+    # so parsed values are cached and the last format that matched is tried first.
+    def __init__(self, formats=IMPORT_DATE_FORMATS):
+        self.formats = list(formats)
+        self.cache = {}
+
+    def parse(self, text):
+        value = self.cache.get(text)
+        if value is None:
+            date_time = self.strptime(text.strip())
+            value = (date_time, format_timestamp(date_time), report_epoch(date_time))
+            if len(self.cache) < DATE_CACHE_SIZE:
+                self.cache[text] = value
+        return value
+
+    def strptime(self, text):
+        for index, date_format in enumerate(self.formats):
+            try:
+                date_time = datetime.strptime(text, date_format)
+            except ValueError:
+                continue
+            if index:
+                self.formats.insert(0, self.formats.pop(index))
+            return date_time
+        raise ValueError(f"Unrecognised date '{text}'")
+
+def report_values(row, dates):
+    if len(row) < 6:
+        raise ValueError(f"Expected 6 columns, got {len(row)}")
+    date_time, timestamp, epoch = dates.parse(row[0])
+    reporter, reportee, report_reason, evidence, punishment = row[1:6]
+    return (timestamp, reporter, reportee, report_reason, evidence, punishment,
+            name_key(reporter), name_key(reportee), report_expiry(date_time, punishment), epoch)
+
+def report_key(values):
+    return values[:4]
+
+def existing_keys(conn, batch):
+    # Rows already stored with the same time, reporter, reportee and reason, looked up through the date_time index.
+    # Earlier batches of this import are already inserted, so this also catches duplicates within the file.
+    timestamps = list({values[0] for values in batch})
+    keys = set()
+    for start in range(0, len(timestamps), MAX_QUERY_PARAMS):
+        chunk = timestamps[start:start + MAX_QUERY_PARAMS]
+        placeholders = ', '.join('?' for _ in chunk)
+        keys.update(tuple(row) for row in conn.execute(
+            f'SELECT date_time, reporter, reportee, report_reason FROM report WHERE date_time IN ({placeholders})', chunk))
+    return keys
+
+def import_reports(job, pool, file_path, name_index=None):
+    # Streams the CSV into the report table in one transaction; a cancelled or failed import leaves nothing behind.
+    # Rows that can't be parsed are written to a rejected-rows CSV attached to the job.
+    dates = DateParser()
+    rejected_path = os.path.join(tempfile.gettempdir(), f'rejected_rows_{job.id}.csv')
+    rejected_file = None
+    rejected_writer = None
+    counts = {'rows_read': 0, 'imported': 0, 'duplicates': 0, 'rejected': 0}
+    job.update(bytes_total=os.path.getsize(file_path), bytes_done=0, **counts)
+
+    def flush(conn, batch):
+        job.check_cancelled()
+        seen = existing_keys(conn, batch)
+        new_rows = []
+        for values in batch:
+            key = report_key(values)
+            if key not in seen:
+                seen.add(key)
+                new_rows.append(values)
+        conn.executemany(INSERT_REPORT, new_rows)
+        counts['imported'] += len(new_rows)
+        counts['duplicates'] += len(batch) - len(new_rows)
+        job.update(bytes_done=file.buffer.tell(), **counts)
+
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8-sig') as file, pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            start_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM report').fetchone()[0]
+            with deferred_fts_index(conn, 'report', REPORT_FTS_COLUMNS, start_id), deferred_report_stats(conn, start_id):
+                batch = []
+                for line_number, row in enumerate(csv.reader(file), start=1):
+                    counts['rows_read'] += 1
+                    try:
+                        batch.append(report_values(row, dates))
+                    except ValueError as e:
+                        counts['rejected'] += 1
+                        if rejected_writer is None:
+                            rejected_file = open(rejected_path, 'w', newline='', encoding='utf-8')
+                            rejected_writer = csv.writer(rejected_file)
+                            rejected_writer.writerow(['Line', 'Error', 'Row'])
+                        rejected_writer.writerow([line_number, str(e)] + row)
+                        continue
+                    if len(batch) >= BATCH_SIZE:
+                        flush(conn, batch)
+                        batch = []
+                if batch:
+                    flush(conn, batch)
+
+                cursor = conn.execute("SELECT id, report_reason FROM report WHERE id > ? AND report_reason IS NOT NULL AND report_reason != ''", (start_id,))
+                while True:
+                    rows = cursor.fetchmany(BATCH_SIZE)
+                    if not rows:
+                        break
+                    job.check_cancelled()
+                    insert_report_reasons(conn, rows)
+
+            # AUTOINCREMENT ids only grow, so everything past start_id was inserted by this import
+            cursor = conn.execute("SELECT id, evidence FROM report WHERE id > ? AND evidence IS NOT NULL AND evidence != ''", (start_id,))
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                job.check_cancelled()
+                insert_evidence(conn, 'report_evidence', 'report_id', [item for report_id, evidence in rows for item in evidence_rows(report_id, evidence)])
+            job.check_cancelled()
+    finally:
+        if rejected_file is not None:
+            rejected_file.close()
+            job.add_file('rejected_rows.csv', rejected_path)
+
+    job.update(bytes_done=job.progress['bytes_total'], **counts)
+    if name_index is not None:
+        with pool.connection() as conn:
+            rows = conn.execute('SELECT reporter, reportee, date_time FROM report WHERE id > ?', (start_id,)).fetchall()
+        name_index.add_many([(row[0], row[2]) for row in rows] + [(row[1], row[2]) for row in rows])
+    print(f"Imported {counts['imported']} reports, skipped {counts['duplicates']} duplicates and {counts['rejected']} rejected rows")
+    return counts
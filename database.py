@@ -0,0 +1,383 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from durations import ban_epoch, ban_expiry, epoch_ban_expiry, epoch_seconds, report_epoch, report_expiry
+from evidence import store_evidence
+from evidenceindex import create_evidence_file_tables
+from metrics import QUERY_SECONDS, SLOW_QUERIES
+from names import name_key
+from reasons import create_reason_tables
+from reportstats import create_report_stats, recreate_report_stats
+
+BUSY_TIMEOUT = 10
+POOL_SIZE = 8
+REPORT_FTS_COLUMNS = ['reporter', 'reportee', 'report_reason', 'punishment']
+SLOW_QUERY_LOG_SIZE = 100
+
+# Statements slower than this are printed with their query plan; None turns the log off
+slow_query_ms = 100
+slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+def statement_type(sql):
+    keyword = sql.lstrip().split(None, 1)
+    return keyword[0].upper() if keyword else ''
+
+def query_plan(conn, sql, parameters):
+    try:
+        rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[3] for row in rows]
+
+def record_query(conn, sql, parameters, elapsed, explain=True):
+    QUERY_SECONDS.observe(elapsed, conn.name, statement_type(sql))
+    if slow_query_ms is None or elapsed * 1000 < slow_query_ms:
+        return
+    SLOW_QUERIES.inc(conn.name)
+    plan = query_plan(conn, sql, parameters) if explain else []
+    slow_queries.append({
+        'database': conn.name,
+        'ms': round(elapsed * 1000, 3),
+        'sql': ' '.join(sql.split()),
+        'plan': plan,
+        'at': datetime.now().isoformat(timespec='seconds')
+    })
+    print(f"Slow query on {conn.name} ({elapsed * 1000:.1f} ms): {' '.join(sql.split())}")
+    for detail in plan:
+        print(f"    {detail}")
+
+class TimedCursor(sqlite3.Cursor):
+    # Times execute() only: SQLite steps to the first row there, which covers sorts, aggregates and
+    # full scans, but rows fetched afterwards are not counted.
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query(self.connection, sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_query(self.connection, sql, (), time.perf_counter() - started, explain=False)
+
+class TimedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = os.path.basename(args[0] if args else kwargs.get('database', ''))
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            record_query(self, 'SCRIPT', (), time.perf_counter() - started, explain=False)
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}')
+    return conn
+
+class ConnectionPool:
+    # Werkzeug serves each request on a fresh thread, so connections are reused through a LIFO
+    # queue rather than thread-locals; a connection is only ever used by one thread at a time.
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.watcher = None
+        self.watcher_lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return connect(self.path)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def data_version(self):
+        # PRAGMA data_version changes whenever another connection commits. The watcher connection
+        # never writes, so it sees commits from the pool, other processes and external tools alike.
+        with self.watcher_lock:
+            if self.watcher is None:
+                self.watcher = connect(self.path)
+            return self.watcher.execute('PRAGMA data_version').fetchone()[0]
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path):
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+def fts5_available(conn):
+    try:
+        conn.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(value)')
+        conn.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def create_fts_insert_trigger(conn, table, columns):
+    fts = f'{table}_fts'
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+
+def create_fts_index(conn, table, columns):
+    # External-content FTS5 table mirroring `columns` of `table`, kept in sync by triggers.
+    # Skipped on SQLite builds without FTS5; the search routes fall back to LIKE there.
+    if not fts5_available(conn):
+        return
+    fts = f'{table}_fts'
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column_list}, content='{table}', content_rowid='id', prefix='2 3')")
+    create_fts_insert_trigger(conn, table, columns)
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+@contextmanager
+def deferred_fts_index(conn, table, columns, start_id):
+    # For bulk loads inside a transaction: rows inserted in the block skip the per-row trigger and are
+    # indexed with one INSERT ... SELECT afterwards, which is several times faster.
+    fts = f'{table}_fts'
+    if not has_table(conn, fts):
+        yield
+        return
+    conn.execute(f'DROP TRIGGER IF EXISTS {fts}_insert')
+    yield
+    column_list = ', '.join(columns)
+    conn.execute(f'INSERT INTO {fts} (rowid, {column_list}) SELECT id, {column_list} FROM {table} WHERE id > ?', (start_id,))
+    create_fts_insert_trigger(conn, table, columns)
+
+def fts_query(text, column=None):
+    # Every word of the search becomes a quoted prefix term, so user input can't inject FTS5 syntax
+    terms = [f'"{term}"*' for term in re.findall(r'\w+', text)]
+    if not terms:
+        return None
+    query = ' AND '.join(terms)
+    return f'{column} : ({query})' if column else query
+
+def add_column(conn, table, column, definition):
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()]
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def add_report_name_keys(conn):
+    add_column(conn, 'report', 'reporter_key', 'TEXT')
+    add_column(conn, 'report', 'reportee_key', 'TEXT')
+    conn.create_function('name_key', 1, name_key, deterministic=True)
+    conn.execute('UPDATE report SET reporter_key = name_key(reporter), reportee_key = name_key(reportee)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_report_reporter_key ON report (reporter_key)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_report_reportee_key ON report (reportee_key)')
+
+def add_ban_name_keys(conn):
+    add_column(conn, 'bans', 'player_key', 'TEXT')
+    conn.create_function('name_key', 1, name_key, deterministic=True)
+    conn.execute('UPDATE bans SET player_key = name_key(player_name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bans_player_key ON bans (player_key)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bans_player_steam_id ON bans (player_steam_id)')
+
+def add_report_expiry(conn):
+    add_column(conn, 'report', 'expires_at', 'TEXT')
+    rows = conn.execute("SELECT id, date_time, punishment FROM report WHERE punishment LIKE '%ban%'").fetchall()
+    conn.executemany('UPDATE report SET expires_at = ? WHERE id = ?', [(report_expiry(row[1], row[2]), row[0]) for row in rows])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_report_expires_at ON report (expires_at)')
+
+def add_ban_expiry(conn):
+    add_column(conn, 'bans', 'expires_at', 'TEXT')
+    rows = conn.execute('SELECT id, date, length FROM bans').fetchall()
+    conn.executemany('UPDATE bans SET expires_at = ? WHERE id = ?', [(ban_expiry(row[1], row[2]), row[0]) for row in rows])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bans_expires_at ON bans (expires_at)')
+
+# Every scraped ban stored before bans recorded their site came from this ban list
+LEGACY_BAN_SITE = 'https://garnetgaming.net/darkrp/bans'
+
+def add_ban_sites(conn):
+    add_column(conn, 'bans', 'site', "TEXT NOT NULL DEFAULT ''")
+    # Bans added by hand have no admin steam ID and keep an empty site
+    conn.execute("UPDATE bans SET site = ? WHERE admin_steam_id != ''", (LEGACY_BAN_SITE,))
+    conn.execute('DROP INDEX IF EXISTS idx_bans_unique')
+    # Scraped bans only; each ban added by hand is kept
+    conn.execute("CREATE UNIQUE INDEX idx_bans_unique ON bans (date, player_steam_id, admin_steam_id, reason, site) WHERE site != ''")
+    # Per-admin views of a mirrored ban list, newest first
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bans_admin_steam_id ON bans (admin_steam_id, date)')
+
+def add_report_epochs(conn):
+    add_column(conn, 'report', 'date_time_epoch', 'INTEGER')
+    conn.create_function('report_epoch', 1, report_epoch)
+    conn.execute('UPDATE report SET date_time_epoch = report_epoch(date_time)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_report_date_time_epoch ON report (date_time_epoch)')
+
+def add_ban_epochs(conn):
+    add_column(conn, 'bans', 'date_epoch', 'INTEGER')
+    conn.create_function('ban_epoch', 2, ban_epoch)
+    conn.execute('UPDATE bans SET date_epoch = ban_epoch(date, site)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bans_date_epoch ON bans (date_epoch)')
+    conn.execute('DROP INDEX IF EXISTS idx_bans_admin_steam_id')
+    conn.execute('CREATE INDEX idx_bans_admin_steam_id ON bans (admin_steam_id, date_epoch)')
+
+def add_ban_local_expiry(conn):
+    # expires_at was built from the raw scraped date; rebuild it from date_epoch so it's in server-local time
+    rows = conn.execute('SELECT id, date_epoch, length FROM bans').fetchall()
+    conn.executemany('UPDATE bans SET expires_at = ? WHERE id = ?', [(epoch_ban_expiry(row[1], row[2]), row[0]) for row in rows])
+
+def add_report_reasons(conn):
+    create_reason_tables(conn)
+    # Reason counts now come from the junction, so the stats triggers are rebuilt around it
+    recreate_report_stats(conn)
+
+def create_evidence_table(conn, table, owner_table, owner_column):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {owner_column} INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            location TEXT NOT NULL
+        )
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_owner ON {table} ({owner_column}, ordinal)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_location ON {table} (location)')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_cleanup AFTER DELETE ON {owner_table} BEGIN
+            DELETE FROM {table} WHERE {owner_column} = old.id;
+        END
+    ''')
+    for owner_id, text in conn.execute(f"SELECT id, evidence FROM {owner_table} WHERE evidence IS NOT NULL AND evidence != ''").fetchall():
+        store_evidence(conn, table, owner_column, owner_id, text)
+
+# Each entry upgrades the schema by one version, tracked in PRAGMA user_version.
+# Entries are SQL scripts or callables taking the connection.
+REPORT_MIGRATIONS = [
+    '''
+    CREATE INDEX IF NOT EXISTS idx_report_date_time ON report (date_time);
+    CREATE INDEX IF NOT EXISTS idx_report_reporter ON report (reporter);
+    CREATE INDEX IF NOT EXISTS idx_report_reportee ON report (reportee);
+    CREATE INDEX IF NOT EXISTS idx_report_punishment ON report (punishment);
+    ''',
+    lambda conn: create_fts_index(conn, 'report', REPORT_FTS_COLUMNS),
+    add_report_name_keys,
+    add_report_expiry,
+    lambda conn: create_evidence_table(conn, 'report_evidence', 'report', 'report_id'),
+    create_report_stats,
+    add_report_reasons,
+    create_evidence_file_tables,
+    add_report_epochs,
+]
+
+BAN_MIGRATIONS = [
+    lambda conn: add_column(conn, 'bans', 'evidence', 'TEXT'),
+    lambda conn: create_fts_index(conn, 'bans', ['player_name', 'admin_name', 'reason']),
+    add_ban_name_keys,
+    add_ban_expiry,
+    lambda conn: create_evidence_table(conn, 'ban_evidence', 'bans', 'ban_id'),
+    '''
+    -- Only scraped bans, which carry the player's steam ID, are deduplicated; bans added by hand
+    -- have none and can share a minute and a reason with a different player
+    DELETE FROM bans WHERE player_steam_id != '' AND id NOT IN (
+        SELECT MIN(id) FROM bans WHERE player_steam_id != '' GROUP BY date, player_steam_id, admin_steam_id, reason
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_bans_unique ON bans (date, player_steam_id, admin_steam_id, reason) WHERE player_steam_id != '';
+    CREATE TABLE IF NOT EXISTS scrape_state (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    );
+    ''',
+    add_ban_sites,
+    add_ban_epochs,
+    add_ban_local_expiry,
+]
+
+def schema_current(conn, migrations):
+    return conn.execute('PRAGMA user_version').fetchone()[0] >= len(migrations)
+
+def migrate(conn, migrations):
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(migrations[version:], start=version + 1):
+        try:
+            if callable(migration):
+                conn.execute('BEGIN')
+                migration(conn)
+                conn.execute(f'PRAGMA user_version = {number}')
+                conn.commit()
+            else:
+                conn.executescript(f'BEGIN;\n{migration}\nPRAGMA user_version = {number};\nCOMMIT;')
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+    return len(migrations)
+
+# Ranges are [start, end) epoch seconds, for the indexed date_time_epoch and date_epoch columns
+def day_range(day, timezone=None):
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=1)
+    return epoch_seconds(start, timezone), epoch_seconds(end, timezone)
+
+def month_range(month, timezone=None):
+    start = month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return epoch_seconds(start, timezone), epoch_seconds(end, timezone)
+
+def keyset_clause(sort_column, sort_order, after, after_id):
+    if after is None or after_id is None:
+        return '', []
+    operator = '<' if sort_order == 'DESC' else '>'
+    return f" AND ({sort_column}, id) {operator} (?, ?)", [after, after_id]
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+PERMANENT_BAN = datetime(9999, 12, 31, 23, 59, 59)
+BAN_DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%m/%d/%Y %I:%M %p', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%Y-%m-%d',
+                    '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%d %H:%M:%S%z']
+# Scraped ban dates carry no timezone; they are read in this one (set from BAN_SITE_TIMEZONE), or the server's local time
+ban_site_timezone = None
+
+def format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if value else None
+
+def is_ban(punishment):
+    return 'ban' in (punishment or '').lower()
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    value = (value or '').strip()
+    for date_format in BAN_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return None
+
+def load_timezone(name):
+    if not name:
+        return None
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception as e:
+        # Windows has no timezone database unless the tzdata package is installed
+        print(f"Unknown timezone {name}, using local time: {e}")
+        return None
+
+def epoch_seconds(value, timezone=None):
+    # Canonical integer timestamp for a stored or scraped date; times without an offset are read in `timezone`,
+    # or the server's local time. None for dates that don't parse.
+    value = parse_date(value)
+    if value is None:
+        return None
+    if value.tzinfo is None and timezone is not None:
+        value = value.replace(tzinfo=timezone)
+    try:
+        return int(value.timestamp())
+    except (OverflowError, OSError, ValueError):
+        return None
+
+# The stored epoch columns hold 0 for dates that don't parse, so they sort before every real date
+# and keyset paging over them never meets a NULL
+def report_epoch(date_time):
+    return epoch_seconds(date_time) or 0
+
+def ban_epoch(date, site):
+    # Bans added by hand have no site and were entered in local time
+    return epoch_seconds(date, ban_site_timezone if site else None) or 0
+
+def parse_duration(text):
+    # Raises ValueError for text that isn't "<number> <unit>", returns None for units we don't know
+    text = (text or '').strip().lower()
+    parts = text.split()
+    if len(parts) < 2:
+        raise ValueError(f"Invalid duration '{text}'")
+    value = int(parts[0])
+    unit = parts[1]
+
+    if "day" in unit:
+        return timedelta(days=value)
+    elif "week" in unit:
+        return timedelta(weeks=value)
+    elif "month" in unit:
+        return timedelta(days=value * 30)
+    elif "year" in unit:
+        return timedelta(days=value * 365)
+    elif "hour" in unit or "hr" in unit:
+        return timedelta(hours=value)
+    elif "min" in unit:
+        return timedelta(minutes=value)
+    return None
+
+def ban_expiry(start, duration_text):
+    if 'perm' in (duration_text or '').lower():
+        return format_timestamp(PERMANENT_BAN)
+    start = parse_date(start)
+    if start is None:
+        return None
+    try:
+        duration = parse_duration(duration_text)
+        return format_timestamp(start + duration) if duration else None
+    except (ValueError, OverflowError):
+        return None
+
+def epoch_ban_expiry(epoch, duration_text):
+    # expires_at is compared with the server's datetime.now(), so the ban's canonical start is taken
+    # in server-local time rather than the ban site's clock
+    return ban_expiry(datetime.fromtimestamp(epoch) if epoch else None, duration_text)
+
+def report_expiry(date_time, punishment):
+    return ban_expiry(date_time, punishment) if is_ban(punishment) else None
+
+def ban_status(punishment, expires_at, now):
+    if not is_ban(punishment):
+        return "N/A"
+    if expires_at:
+        return "Active" if expires_at > now else "Expired"
+    try:
+        return "Unknown" if parse_duration(punishment) is None else "Invalid Duration"
+    except ValueError:
+        return "Invalid Duration"
@@ -0,0 +1,32 @@
+def parse_evidence(text):
+    items = []
+    for entry in (text or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.startswith('http://') or entry.startswith('https://'):
+            items.append(('link', entry))
+        else:
+            items.append(('file', entry))
+    return items
+
+def evidence_rows(owner_id, text):
+    return [(owner_id, ordinal, kind, location) for ordinal, (kind, location) in enumerate(parse_evidence(text))]
+
+def insert_evidence(conn, table, owner_column, rows):
+    conn.executemany(f'INSERT INTO {table} ({owner_column}, ordinal, kind, location) VALUES (?, ?, ?, ?)', rows)
+
+def store_evidence(conn, table, owner_column, owner_id, text):
+    conn.execute(f'DELETE FROM {table} WHERE {owner_column} = ?', (owner_id,))
+    insert_evidence(conn, table, owner_column, evidence_rows(owner_id, text))
+
+def fetch_evidence(conn, table, owner_column, owner_ids):
+    evidence = {owner_id: [] for owner_id in owner_ids}
+    if not owner_ids:
+        return evidence
+    placeholders = ', '.join('?' for _ in owner_ids)
+    rows = conn.execute(f'SELECT {owner_column}, kind, location FROM {table} WHERE {owner_column} IN ({placeholders}) ORDER BY {owner_column}, ordinal',
+                        list(owner_ids)).fetchall()
+    for owner_id, kind, location in rows:
+        evidence[owner_id].append({'type': kind, 'url' if kind == 'link' else 'path': location})
+    return evidence
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from durations import epoch_seconds
+from evidence import store_evidence
+from names import name_key
+
+BATCH_SIZE = 1000
+# Recordings are started before the report is filed: match files from an hour before a report to ten minutes after
+MATCH_BEFORE = timedelta(minutes=60)
+MATCH_AFTER = timedelta(minutes=10)
+MIN_NAME_LENGTH = 3
+MAX_SUGGESTIONS = 10
+TIMESTAMP_PATTERNS = [
+    # EchoFoxtrot20240824201034.mp4
+    re.compile(r'(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})'),
+    # OBS default: 2024-08-24 20-10-34.mp4
+    re.compile(r'(\d{4})-(\d{2})-(\d{2})[ _T](\d{2})[-.](\d{2})[-.](\d{2})'),
+]
+
+def create_evidence_file_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS evidence_file (
+            path TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            recorded_at TEXT,
+            label TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_file_name ON evidence_file (name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_file_recorded_at ON evidence_file (recorded_at)')
+    # One row: which folder evidence_file describes and when it was last scanned
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS evidence_scan (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            folder TEXT NOT NULL,
+            finished_at REAL,
+            files INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_evidence_kind_location ON report_evidence (kind, location)")
+
+def compact(text):
+    # Names as they appear run together in file names: "Echo Foxtrot (Thief)" -> "echofoxtrot"
+    return re.sub(r'[\W_]+', '', name_key(text))
+
+def parse_file_name(name):
+    # Returns (recorded_at, label): the timestamp in the name if there is one, and the rest of the name compacted
+    stem = os.path.splitext(name)[0]
+    for pattern in TIMESTAMP_PATTERNS:
+        match = pattern.search(stem)
+        if match:
+            try:
+                recorded_at = datetime(*(int(part) for part in match.groups()))
+            except ValueError:
+                continue
+            return recorded_at.strftime('%Y-%m-%d %H:%M:%S'), compact(stem[:match.start()] + stem[match.end():])
+    return None, compact(stem)
+
+def normalize_location(location):
+    return location.replace('\\', '/').strip('/')
+
+def scan_folder(root):
+    # os.scandir gives each entry's type, and on Windows its size and mtime, from the directory listing itself
+    pending = ['']
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    relative = f'{relative_dir}/{entry.name}' if relative_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(relative)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            yield relative, entry.name, stat.st_size, stat.st_mtime
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Could not scan {os.path.join(root, relative_dir)}: {e}")
+
+def indexed_folder(conn):
+    row = conn.execute('SELECT folder, finished_at, files FROM evidence_scan WHERE id = 1').fetchone()
+    return row if row and row[1] is not None else None
+
+def name_matches(label, reporter, reportee):
+    return sum(1 for name in (compact(reporter), compact(reportee)) if len(name) >= MIN_NAME_LENGTH and name in label)
+
+def index_evidence(job, pool, folder, auto_link=True):
+    # Brings evidence_file up to date with the folder: only new or changed files (by size and mtime) are
+    # rewritten, and rows for files that are gone are deleted. Newly seen files are then linked to reports.
+    if not os.path.isdir(folder):
+        raise ValueError(f"Evidence folder {folder} does not exist")
+    with pool.connection() as conn:
+        scanned = conn.execute('SELECT folder FROM evidence_scan WHERE id = 1').fetchone()
+        if scanned is None or scanned[0] != folder:
+            conn.execute('DELETE FROM evidence_file')
+            conn.execute('INSERT OR REPLACE INTO evidence_scan (id, folder, finished_at, files) VALUES (1, ?, NULL, 0)', (folder,))
+        known = {path: (size, mtime) for path, size, mtime in conn.execute('SELECT path, size, mtime FROM evidence_file')}
+
+    # The previous scan's file count stands in for a total, for the progress bar
+    job.update(files_total=len(known) or 1, files_scanned=0, files_changed=0, files_removed=0, reports_linked=0)
+    seen = set()
+    changed = []
+    new_paths = []
+
+    def flush():
+        with pool.connection() as conn:
+            conn.executemany('''
+                INSERT INTO evidence_file (path, name, size, mtime, recorded_at, label) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                    recorded_at = excluded.recorded_at, label = excluded.label
+            ''', changed)
+        job.increment('files_changed', len(changed))
+        changed.clear()
+
+    for path, name, size, mtime in scan_folder(folder):
+        seen.add(path)
+        job.increment('files_scanned')
+        if known.get(path) != (size, mtime):
+            if path not in known:
+                new_paths.append(path)
+            changed.append((path, name, size, mtime) + parse_file_name(name))
+            if len(changed) >= BATCH_SIZE:
+                job.check_cancelled()
+                flush()
+    if changed:
+        flush()
+
+    removed = [(path,) for path in known if path not in seen]
+    with pool.connection() as conn:
+        for start in range(0, len(removed), BATCH_SIZE):
+            conn.executemany('DELETE FROM evidence_file WHERE path = ?', removed[start:start + BATCH_SIZE])
+        conn.execute('UPDATE evidence_scan SET finished_at = ?, files = ? WHERE id = 1', (time.time(), len(seen)))
+    job.update(files_removed=len(removed))
+
+    if auto_link and new_paths:
+        job.check_cancelled()
+        job.update(reports_linked=link_new_files(pool, new_paths))
+
+def link_new_files(pool, paths):
+    # Attaches a file to a report only when the match is unambiguous: the file isn't referenced yet, it was
+    # recorded within the report's window, both player names appear in its name, and no other report qualifies.
+    linked = 0
+    with pool.connection() as conn:
+        for start in range(0, len(paths), BATCH_SIZE):
+            chunk = paths[start:start + BATCH_SIZE]
+            placeholders = ', '.join('?' for _ in chunk)
+            files = conn.execute(f'''
+                SELECT path, name, recorded_at, label FROM evidence_file
+                WHERE path IN ({placeholders}) AND recorded_at IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM report_evidence WHERE kind = 'file' AND location IN (evidence_file.path, evidence_file.name))
+            ''', chunk).fetchall()
+            for path, name, recorded_at, label in files:
+                recorded = datetime.strptime(recorded_at, '%Y-%m-%d %H:%M:%S')
+                candidates = conn.execute('''
+                    SELECT id, reporter, reportee, evidence FROM report
+                    WHERE date_time_epoch >= ? AND date_time_epoch <= ?
+                      AND NOT EXISTS (SELECT 1 FROM report_evidence WHERE report_evidence.report_id = report.id AND kind = 'file')
+                ''', (epoch_seconds(recorded - MATCH_AFTER), epoch_seconds(recorded + MATCH_BEFORE))).fetchall()
+                matches = [row for row in candidates if name_matches(label, row[1], row[2]) == 2]
+                if len(matches) != 1:
+                    continue
+                report_id, _, _, evidence = matches[0]
+                evidence = f'{evidence}, {path}' if evidence else path
+                conn.execute('UPDATE report SET evidence = ? WHERE id = ?', (evidence, report_id))
+                store_evidence(conn, 'report_evidence', 'report_id', report_id, evidence)
+                linked += 1
+    return linked
+
+def suggest_evidence(conn, report):
+    # Indexed files recorded around the report, best name match first, then closest in time
+    reported = datetime.fromtimestamp(report['date_time_epoch'])
+    attached = {normalize_location(row[0]) for row in conn.execute(
+        "SELECT location FROM report_evidence WHERE report_id = ? AND kind = 'file'", (report['id'],))}
+    rows = conn.execute('''
+        SELECT path, name, size, recorded_at, label,
+               EXISTS (SELECT 1 FROM report_evidence WHERE kind = 'file' AND location IN (evidence_file.path, evidence_file.name)) AS linked
+        FROM evidence_file WHERE recorded_at >= ? AND recorded_at <= ?
+    ''', ((reported - MATCH_BEFORE).strftime('%Y-%m-%d %H:%M:%S'), (reported + MATCH_AFTER).strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
+    suggestions = []
+    for path, name, size, recorded_at, label, linked in rows:
+        if path in attached or name in attached:
+            continue
+        seconds = abs((datetime.strptime(recorded_at, '%Y-%m-%d %H:%M:%S') - reported).total_seconds())
+        suggestions.append({
+            'path': path,
+            'size': size,
+            'recorded_at': recorded_at,
+            'name_matches': name_matches(label, report['reporter'], report['reportee']),
+            'linked': bool(linked),
+            'seconds_from_report': int(seconds),
+        })
+    suggestions.sort(key=lambda item: (-item['name_matches'], item['seconds_from_report']))
+    return suggestions[:MAX_SUGGESTIONS]
+
+def missing_file_locations(conn, locations):
+    # Which of these file evidence locations have no indexed file, or None before the first completed scan
+    if indexed_folder(conn) is None:
+        return None
+    locations = list(set(locations))
+    found = set()
+    for start in range(0, len(locations), BATCH_SIZE):
+        chunk = locations[start:start + BATCH_SIZE]
+        paths = [normalize_location(location) for location in chunk]
+        placeholders = ', '.join('?' for _ in chunk)
+        rows = conn.execute(f'SELECT path, name FROM evidence_file WHERE path IN ({placeholders}) OR name IN ({placeholders})', paths + chunk)
+        indexed = set()
+        for path, name in rows:
+            indexed.update((path, name))
+        found.update(location for location, path in zip(chunk, paths) if location in indexed or path in indexed)
+    return {location for location in locations if location not in found}
+
+# Reports with at least one file evidence entry that matches no indexed file, by path or by bare name
+MISSING_FILE_CLAUSE = '''report.id IN (
+    SELECT report_evidence.report_id FROM report_evidence WHERE report_evidence.kind = 'file'
+      AND NOT EXISTS (SELECT 1 FROM evidence_file WHERE evidence_file.path = replace(trim(report_evidence.location, '/\\'), '\\', '/'))
+      AND NOT EXISTS (SELECT 1 FROM evidence_file WHERE evidence_file.name = report_evidence.location)
+)'''
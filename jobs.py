@@ -0,0 +1,259 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from database import get_pool
+from locks import FileLock
+
+MAX_ERRORS = 50
+KEEP_FINISHED = 20
+# How often a running job's progress is written to the job store, and a cancel request from another worker picked up
+SYNC_SECONDS = 0.5
+ACTIVE_STATUSES = ('queued', 'running')
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = {}
+        self.errors = []
+        self.files = {}
+        self.started_at = time.time()
+        self.finished_at = None
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+
+    def update(self, **values):
+        with self.lock:
+            self.progress.update(values)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.progress[name] = self.progress.get(name, 0) + amount
+
+    def add_error(self, message):
+        print(message)
+        with self.lock:
+            self.errors.append(message)
+            del self.errors[:-MAX_ERRORS]
+
+    def add_file(self, name, path):
+        # Files the job produced for download, e.g. a rejected-rows report
+        with self.lock:
+            self.files[name] = path
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    @classmethod
+    def from_row(cls, row):
+        # A read-only snapshot of a job stored by JobStore, possibly running in another process
+        state = json.loads(row['state'])
+        job = cls(row['kind'])
+        job.id = row['id']
+        job.status = row['status']
+        job.progress = state['progress']
+        job.errors = state['errors']
+        job.files = json.loads(row['files'])
+        job.started_at = row['started_at']
+        job.finished_at = state['finished_at']
+        if row['cancel_requested']:
+            job.cancel_event.set()
+        return job
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'errors': list(self.errors),
+                'files': sorted(self.files),
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'cancel_requested': self.cancel_event.is_set()
+            }
+
+class JobStore:
+    # Job snapshots in SQLite, so any worker process can report on or cancel a job whichever process
+    # runs it, plus a file lock per job kind so only one process at a time runs a scrape or import.
+    def __init__(self, path):
+        self.path = path
+        self.pool = get_pool(path)
+        self.locks = {}
+
+    def create_table(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    state TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS job_kind_started ON job (kind, started_at)')
+
+    def kind_lock(self, kind):
+        if kind not in self.locks:
+            self.locks[kind] = FileLock(f"{self.path}.{kind}.lock")
+        return self.locks[kind]
+
+    def save(self, job):
+        # Returns whether another process has asked for the job to be cancelled
+        state = job.to_dict()
+        with job.lock:
+            files = json.dumps(job.files)
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO job (id, kind, status, started_at, state, files) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET status = excluded.status, state = excluded.state, files = excluded.files
+            ''', (job.id, job.kind, state['status'], job.started_at, json.dumps(state), files))
+            row = conn.execute('SELECT cancel_requested FROM job WHERE id = ?', (job.id,)).fetchone()
+        return bool(row[0])
+
+    def load(self, job_id):
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT * FROM job WHERE id = ?', (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def latest(self, kind, active=False):
+        sql = 'SELECT * FROM job WHERE kind = ?'
+        if active:
+            sql += f" AND status IN {ACTIVE_STATUSES}"
+        with self.pool.connection() as conn:
+            row = conn.execute(sql + ' ORDER BY started_at DESC LIMIT 1', (kind,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def request_cancel(self, job_id):
+        with self.pool.connection() as conn:
+            return conn.execute('UPDATE job SET cancel_requested = 1 WHERE id = ?', (job_id,)).rowcount > 0
+
+    def abandon(self, kind):
+        # Only called while holding the kind's lock, so queued/running rows left are from a process that died mid-job
+        with self.pool.connection() as conn:
+            conn.execute(f"UPDATE job SET status = 'failed' WHERE kind = ? AND status IN {ACTIVE_STATUSES}", (kind,))
+
+    def prune(self):
+        with self.pool.connection() as conn:
+            conn.execute(f'''
+                DELETE FROM job WHERE status NOT IN {ACTIVE_STATUSES} AND id NOT IN (
+                    SELECT id FROM job WHERE status NOT IN {ACTIVE_STATUSES} ORDER BY started_at DESC LIMIT ?
+                )
+            ''', (KEEP_FINISHED,))
+
+class JobManager:
+    # Runs long tasks (scrapes, imports) on daemon threads so request threads return immediately.
+    # Only one job of each kind runs at a time; starting a second returns the one already running.
+    # With a JobStore that also holds across worker processes.
+    def __init__(self, store=None):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.store = store
+
+    def start(self, kind, target, *args):
+        with self.lock:
+            running = self.active(kind)
+            if running:
+                return running, False
+            kind_lock = None
+            if self.store:
+                kind_lock = self.store.kind_lock(kind)
+                if not kind_lock.acquire(blocking=False):
+                    # Running in another worker; its row may not be written yet in the instant after it took the lock
+                    return self.store.latest(kind, active=True) or self.store.latest(kind) or Job(kind), False
+            job = Job(kind)
+            self.jobs[job.id] = job
+            self.prune()
+            if self.store:
+                self.store.abandon(kind)
+                self.store.save(job)
+        threading.Thread(target=self.run, args=(job, target, args, kind_lock), daemon=True).start()
+        return job, True
+
+    def run(self, job, target, args, kind_lock=None):
+        job.status = 'running'
+        stop_sync = threading.Event()
+        if self.store:
+            threading.Thread(target=self.sync, args=(job, stop_sync), daemon=True).start()
+        try:
+            target(job, *args)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.add_error(f"{job.kind} failed: {e}")
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            stop_sync.set()
+            try:
+                if self.store:
+                    self.store.save(job)
+            finally:
+                if kind_lock:
+                    kind_lock.release()
+
+    def sync(self, job, stop):
+        while not stop.wait(SYNC_SECONDS):
+            try:
+                if self.store.save(job):
+                    job.cancel()
+            except sqlite3.Error as e:
+                print(f"Could not save {job.kind} job progress: {e}")
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None and self.store:
+            job = self.store.load(job_id)
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+            return job
+        if self.store and self.store.request_cancel(job_id):
+            return self.store.load(job_id)
+        return None
+
+    def active(self, kind):
+        for job in self.jobs.values():
+            if job.kind == kind and not job.finished:
+                return job
+        return None
+
+    def latest(self, kind):
+        if self.store:
+            job = self.store.latest(kind)
+            # Prefer the live object when the job runs in this process
+            return self.jobs.get(job.id, job) if job else None
+        matching = [job for job in self.jobs.values() if job.kind == kind]
+        return matching[-1] if matching else None
+
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:-KEEP_FINISHED]:
+            for path in self.jobs.pop(job_id).files.values():
+                if os.path.exists(path):
+                    os.remove(path)
+        if self.store:
+            self.store.prune()
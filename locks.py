@@ -0,0 +1,61 @@
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LOCK_POLL_SECONDS = 0.05
+
+class FileLock:
+    # An OS lock on a file, so it holds across worker processes as well as threads. The OS drops it
+    # when the holding process exits, so a crashed worker never leaves a job or config write locked.
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.Lock()
+        self.file = None
+
+    def try_lock(self, file):
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking=True):
+        if not self.thread_lock.acquire(blocking):
+            return False
+        file = open(self.path, 'a+')
+        while not self.try_lock(file):
+            if not blocking:
+                file.close()
+                self.thread_lock.release()
+                return False
+            time.sleep(LOCK_POLL_SECONDS)
+        self.file = file
+        return True
+
+    def release(self):
+        file, self.file = self.file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            file.close()
+            self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -1,6 +1,7 @@
 const { app, BrowserWindow, globalShortcut, screen, dialog, ipcMain } = require('electron');
 const fs = require('fs');
 const path = require('path');
+const http = require('http');
 const { spawn } = require('child_process');
 const treeKill = require('tree-kill');
 const { autoUpdater } = require('electron-updater');
@@ -11,6 +12,10 @@ let reportWindow;
 let pythonProcess;
 let configPath = path.join(__dirname, 'config.json');
 
+const SERVER_URL = 'http://localhost:4200';
+const HEALTH_POLL_MS = 100;
+const HEALTH_TIMEOUT_MS = 60000;
+
 function loadConfig() {
     if (fs.existsSync(configPath)) {
         const data = fs.readFileSync(configPath);
@@ -48,6 +53,46 @@ function registerCustomShortcut() {
     }
 }
 
+// Polls /healthz until the backend answers, instead of waiting for Flask's startup banner on stdout
+function waitForServer(onReady) {
+    const started = Date.now();
+
+    const retry = () => {
+        if (!pythonProcess || pythonProcess.exitCode !== null) {
+            return;
+        }
+        if (Date.now() - started > HEALTH_TIMEOUT_MS) {
+            console.error(`Backend server did not become ready within ${HEALTH_TIMEOUT_MS} ms`);
+            return;
+        }
+        setTimeout(poll, HEALTH_POLL_MS);
+    };
+
+    const poll = () => {
+        let retried = false;
+        const retryOnce = () => {
+            if (!retried) {
+                retried = true;
+                retry();
+            }
+        };
+        const request = http.get(`${SERVER_URL}/healthz`, (response) => {
+            response.resume();
+            if (response.statusCode === 200) {
+                retried = true;
+                console.log(`Backend server ready after ${Date.now() - started} ms`);
+                onReady();
+            } else {
+                retryOnce();
+            }
+        });
+        request.setTimeout(1000, () => request.destroy());
+        request.on('error', retryOnce);
+    };
+
+    poll();
+}
+
 function createWindow() {
     const { width, height } = screen.getPrimaryDisplay().workAreaSize;
     mainWindow = new BrowserWindow({
@@ -158,12 +203,13 @@ app.on('ready', () => {
     createWindow();
     createReportWindow();
 
+    waitForServer(() => {
+        mainWindow.loadURL(SERVER_URL);
+        registerCustomShortcut();
+    });
+
     pythonProcess.stdout.on('data', (data) => {
         console.log(`Backend Server Output: ${data}`);
-        if (data.toString().includes("Serving Flask app")) {
-            mainWindow.loadURL('http://localhost:4200');
-            registerCustomShortcut();
-        }
     });
 
     pythonProcess.stderr.on('data', (data) => {
@@ -0,0 +1,104 @@
+import bisect
+import threading
+
+# Seconds; spans sub-millisecond cache hits up to multi-second exports and scrapes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REGISTRY = []
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # label values -> [per-bucket counts (non-cumulative, last is +Inf), sum]
+        self.series = {}
+        REGISTRY.append(self)
+
+    def observe(self, seconds, *label_values):
+        # Labels are kept as strings: a status can be 200 or 'error', and mixed types can't be sorted
+        label_values = tuple(map(str, label_values))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket_labels = format_labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.label_names, labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        label_values = tuple(map(str, label_values))
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            values = sorted(self.values.items())
+        lines.extend(f'{self.name}{format_labels(self.label_names, labels)} {value}' for labels, value in values)
+        return lines
+
+class Gauge:
+    # Read when /metrics is scraped; callback returns a number, or a dict of label values -> number.
+    # metric_type='counter' exposes totals that are kept elsewhere, e.g. the response cache hit count.
+    def __init__(self, name, help_text, callback, label_names=(), metric_type='gauge'):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.label_names = tuple(label_names)
+        self.metric_type = metric_type
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines.extend(f'{self.name}{format_labels(self.label_names, labels)} {value}' for labels, value in sorted(values.items(), key=lambda item: tuple(map(str, item[0]))))
+        return lines
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time to build each response, by route.', ['route', 'method', 'status'])
+QUERY_SECONDS = Histogram('sqlite_query_duration_seconds', 'Time spent in execute() per SQL statement, by database and statement type.', ['database', 'statement'])
+SLOW_QUERIES = Counter('sqlite_slow_queries_total', 'Statements slower than the slow query threshold.', ['database'])
+SCRAPE_FETCH_SECONDS = Histogram('scraper_page_fetch_seconds', 'Ban page download time.', ['status'])
+SCRAPE_PARSE_SECONDS = Histogram('scraper_page_parse_seconds', 'Ban page parse time.', ['backend'])
@@ -0,0 +1,120 @@
+import bisect
+import heapq
+import re
+import threading
+from datetime import datetime
+
+def name_key(name):
+    # Scraped names carry suffixes like "Name (Job)"; lookups match on the bare, case-folded name
+    return re.sub(r"\(.*\)", "", name or '').strip().casefold()
+
+def name_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return 0
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class NameIndex:
+    # Player names from reports and bans, kept in memory for /autocomplete.
+    # Prefix lookups bisect a sorted key list, substring lookups intersect trigram postings.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = threading.Event()
+        self.entries = {}
+        self.keys = []
+        self.postings = {}
+
+    def load(self, rows):
+        # Replaces the whole index; searches use the old one until the new one is built
+        fresh = NameIndex()
+        fresh.add_many(rows)
+        with self.lock:
+            self.entries, self.keys, self.postings = fresh.entries, fresh.keys, fresh.postings
+        self.loaded.set()
+
+    def add(self, name, seen=None):
+        with self.lock:
+            self._add(name, name_timestamp(seen))
+
+    def add_many(self, rows):
+        # New keys are sorted in once at the end instead of insort-ing each into the key list
+        new_keys = []
+        with self.lock:
+            for name, seen in rows:
+                self._add(name, name_timestamp(seen), new_keys)
+            if new_keys:
+                self.keys.extend(new_keys)
+                self.keys.sort()
+
+    def remove(self, name):
+        with self.lock:
+            key = (name or '').strip().lower()
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self.entries[key]
+                del self.keys[bisect.bisect_left(self.keys, key)]
+                for gram in trigrams(key):
+                    self.postings[gram].discard(key)
+
+    def _add(self, name, seen, new_keys=None):
+        name = (name or '').strip()
+        if not name:
+            return
+        key = name.lower()
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [name, 1, seen]
+            if new_keys is None:
+                bisect.insort(self.keys, key)
+            else:
+                new_keys.append(key)
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, set()).add(key)
+        else:
+            entry[1] += 1
+            if seen >= entry[2]:
+                entry[0] = name
+                entry[2] = seen
+
+    def search(self, query, limit=10, timeout=5):
+        query = query.strip().lower()
+        if not query:
+            return []
+        self.loaded.wait(timeout)
+        with self.lock:
+            prefixed = []
+            start = bisect.bisect_left(self.keys, query)
+            for key in self.keys[start:]:
+                if not key.startswith(query):
+                    break
+                prefixed.append(key)
+
+            if len(query) >= 3:
+                candidates = None
+                for gram in trigrams(query):
+                    posting = self.postings.get(gram, set())
+                    candidates = posting if candidates is None else candidates & posting
+                    if not candidates:
+                        break
+                candidates = candidates or set()
+            else:
+                candidates = self.entries.keys()
+            prefix_set = set(prefixed)
+            contained = [key for key in candidates if query in key and key not in prefix_set]
+
+            def rank(key):
+                entry = self.entries[key]
+                return (-entry[1], -entry[2], key)
+
+            ordered = heapq.nsmallest(limit, prefixed, key=rank)
+            if len(ordered) < limit:
+                ordered += heapq.nsmallest(limit - len(ordered), contained, key=rank)
+            return [self.entries[key][0] for key in ordered]
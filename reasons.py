@@ -0,0 +1,98 @@
+OTHER_REASON = 'Other'
+# Reasons offered as checkboxes on the report forms, in display order
+STANDARD_REASONS = ['RDM', 'MassRDM', 'NLR', 'MassNLR', 'FailRP', 'FailBase', 'Propblock', 'PB Spawn', 'LTAP',
+                    'Racism', 'Homophobia', 'Advertising', 'Cheating', 'None', OTHER_REASON]
+
+def parse_reasons(text):
+    # "RDM, NLR", legacy "ARDM & RDM" and "Other, <free text>" all become [(name, detail)];
+    # everything after Other is its free-text detail.
+    reasons = []
+    seen = set()
+    parts = [part.strip() for part in (text or '').split(',')]
+    for index, part in enumerate(parts):
+        if part.casefold() == OTHER_REASON.casefold():
+            reasons.append((OTHER_REASON, ', '.join(parts[index + 1:]).strip() or None))
+            break
+        for name in part.split('&'):
+            name = name.strip()
+            if name and name.casefold() not in seen:
+                seen.add(name.casefold())
+                reasons.append((name, None))
+    return reasons
+
+def format_reasons(names, other_reason=None):
+    # The comma-joined form kept in report.report_reason for the table view and CSV files
+    names = [name for name in names if name != OTHER_REASON]
+    if other_reason is not None:
+        names.append(OTHER_REASON)
+        if other_reason.strip():
+            names.append(other_reason.strip())
+    return ', '.join(names)
+
+def form_reasons(form):
+    names = form.getlist('report_reason')
+    other_reason = form.get('other_reason', '') if OTHER_REASON in names else None
+    return format_reasons(names, other_reason)
+
+def create_reason_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reason (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            listed INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS report_reason (
+            report_id INTEGER NOT NULL,
+            reason_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            detail TEXT,
+            PRIMARY KEY (report_id, reason_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_report_reason_reason ON report_reason (reason_id, report_id)')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS report_reason_cleanup AFTER DELETE ON report BEGIN
+            DELETE FROM report_reason WHERE report_id = old.id;
+        END
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO reason (name, listed) VALUES (?, 1)', [(name,) for name in STANDARD_REASONS])
+    cursor = conn.execute("SELECT id, report_reason FROM report WHERE report_reason IS NOT NULL AND report_reason != ''")
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        insert_report_reasons(conn, rows)
+
+def reason_ids(conn, names):
+    names = list(set(names))
+    conn.executemany('INSERT OR IGNORE INTO reason (name) VALUES (?)', [(name,) for name in names])
+    ids = {}
+    for start in range(0, len(names), 900):
+        chunk = names[start:start + 900]
+        placeholders = ', '.join('?' for _ in chunk)
+        for reason_id, name in conn.execute(f'SELECT id, name FROM reason WHERE name IN ({placeholders})', chunk):
+            ids[name.casefold()] = reason_id
+    return ids
+
+def insert_report_reasons(conn, rows):
+    # rows are (report_id, comma-joined reasons) for reports that have no junction rows yet
+    parsed = [(report_id, parse_reasons(text)) for report_id, text in rows]
+    ids = reason_ids(conn, [name for _, reasons in parsed for name, _ in reasons])
+    conn.executemany('INSERT INTO report_reason (report_id, reason_id, ordinal, detail) VALUES (?, ?, ?, ?)',
+                     [(report_id, ids[name.casefold()], ordinal, detail)
+                      for report_id, reasons in parsed for ordinal, (name, detail) in enumerate(reasons)])
+
+def store_reasons(conn, report_id, text):
+    conn.execute('DELETE FROM report_reason WHERE report_id = ?', (report_id,))
+    insert_report_reasons(conn, [(report_id, text)])
+
+def fetch_reasons(conn, report_id):
+    return conn.execute('''
+        SELECT reason.name, report_reason.detail FROM report_reason JOIN reason ON reason.id = report_reason.reason_id
+        WHERE report_reason.report_id = ? ORDER BY report_reason.ordinal
+    ''', (report_id,)).fetchall()
+
+def listed_reasons(conn):
+    return [row[0] for row in conn.execute('SELECT name FROM reason WHERE listed = 1 ORDER BY id')]
@@ -0,0 +1,125 @@
+import argparse
+import sqlite3
+from contextlib import contextmanager
+
+# Each dimension gets a report_stats_<name> (label, count) table, kept current by triggers on report.
+# Missing values are counted under '' so every row lands in exactly one label.
+STATS_DIMENSIONS = {
+    'reporter': '{row}.reporter',
+    'reportee': '{row}.reportee',
+    'month': "strftime('%Y-%m', {row}.date_time)",
+}
+STATS_SOURCE_COLUMNS = 'reporter, reportee, date_time'
+# Reasons are counted from the report_reason junction instead, once per reason a report lists
+STATS_TABLES = list(STATS_DIMENSIONS) + ['reason']
+STATS_TRIGGERS = ['report_stats_insert', 'report_stats_delete', 'report_stats_update',
+                  'report_stats_reason_insert', 'report_stats_reason_delete']
+
+def stats_label(dimension, row):
+    return f"IFNULL({STATS_DIMENSIONS[dimension].format(row=row)}, '')"
+
+def stats_increments():
+    return ''.join(
+        f"INSERT INTO report_stats_{dimension} (label, count) VALUES ({stats_label(dimension, 'new')}, 1) "
+        f"ON CONFLICT (label) DO UPDATE SET count = count + 1;\n"
+        for dimension in STATS_DIMENSIONS)
+
+def stats_decrements():
+    return ''.join(
+        f"UPDATE report_stats_{dimension} SET count = count - 1 WHERE label = {stats_label(dimension, 'old')};\n"
+        f"DELETE FROM report_stats_{dimension} WHERE label = {stats_label(dimension, 'old')} AND count <= 0;\n"
+        for dimension in STATS_DIMENSIONS)
+
+def create_stats_insert_trigger(conn):
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS report_stats_insert AFTER INSERT ON report BEGIN\n{stats_increments()}END')
+
+def create_reason_insert_trigger(conn):
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS report_stats_reason_insert AFTER INSERT ON report_reason BEGIN
+            INSERT INTO report_stats_reason (label, count) SELECT name, 1 FROM reason WHERE id = new.reason_id
+            ON CONFLICT (label) DO UPDATE SET count = count + 1;
+        END
+    ''')
+
+def has_reason_tables(conn):
+    # Databases migrated before the reason tables existed only get the report triggers
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_reason'").fetchone() is not None
+
+def create_report_stats(conn):
+    for dimension in STATS_TABLES:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS report_stats_{dimension} (label TEXT PRIMARY KEY, count INTEGER NOT NULL)')
+
+    create_stats_insert_trigger(conn)
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS report_stats_delete AFTER DELETE ON report BEGIN\n{stats_decrements()}END')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS report_stats_update AFTER UPDATE OF {STATS_SOURCE_COLUMNS} ON report BEGIN\n{stats_decrements()}{stats_increments()}END')
+    if has_reason_tables(conn):
+        create_reason_insert_trigger(conn)
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS report_stats_reason_delete AFTER DELETE ON report_reason BEGIN
+                UPDATE report_stats_reason SET count = count - 1 WHERE label = (SELECT name FROM reason WHERE id = old.reason_id);
+                DELETE FROM report_stats_reason WHERE label = (SELECT name FROM reason WHERE id = old.reason_id) AND count <= 0;
+            END
+        ''')
+    rebuild_report_stats(conn)
+
+def recreate_report_stats(conn):
+    # Used by migrations that change which triggers feed the tables
+    for trigger in STATS_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    create_report_stats(conn)
+
+def rebuild_report_stats(conn):
+    for dimension in STATS_DIMENSIONS:
+        conn.execute(f'DELETE FROM report_stats_{dimension}')
+        conn.execute(f'INSERT INTO report_stats_{dimension} (label, count) SELECT {stats_label(dimension, "report")}, COUNT(*) FROM report GROUP BY 1')
+    conn.execute('DELETE FROM report_stats_reason')
+    if has_reason_tables(conn):
+        conn.execute('''
+            INSERT INTO report_stats_reason (label, count)
+            SELECT reason.name, COUNT(*) FROM report_reason JOIN reason ON reason.id = report_reason.reason_id GROUP BY reason.id
+        ''')
+
+@contextmanager
+def deferred_report_stats(conn, start_id):
+    # For bulk loads inside a transaction: rows inserted in the block are counted with one
+    # GROUP BY per dimension afterwards instead of four upserts per row.
+    conn.execute('DROP TRIGGER IF EXISTS report_stats_insert')
+    conn.execute('DROP TRIGGER IF EXISTS report_stats_reason_insert')
+    yield
+    for dimension in STATS_DIMENSIONS:
+        conn.execute(f'''
+            INSERT INTO report_stats_{dimension} (label, count)
+            SELECT {stats_label(dimension, "report")}, COUNT(*) FROM report WHERE id > ? GROUP BY 1
+            ON CONFLICT (label) DO UPDATE SET count = count + excluded.count
+        ''', (start_id,))
+    create_stats_insert_trigger(conn)
+    if has_reason_tables(conn):
+        conn.execute('''
+            INSERT INTO report_stats_reason (label, count)
+            SELECT reason.name, COUNT(*) FROM report_reason JOIN reason ON reason.id = report_reason.reason_id
+            WHERE report_reason.report_id > ? GROUP BY reason.id
+            ON CONFLICT (label) DO UPDATE SET count = count + excluded.count
+        ''', (start_id,))
+        create_reason_insert_trigger(conn)
+
+def read_report_stats(conn):
+    stats = {}
+    for dimension in STATS_TABLES:
+        stats[dimension] = [{'label': label, 'value': count} for label, count in
+                            conn.execute(f'SELECT label, count FROM report_stats_{dimension} ORDER BY label').fetchall()]
+    stats['total'] = sum(row['value'] for row in stats['month'])
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the report statistics tables from the report table.')
+    parser.add_argument('database', nargs='?', default='reports.db')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    with conn:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'report_stats_insert'").fetchone():
+            rebuild_report_stats(conn)
+        else:
+            create_report_stats(conn)
+    print(f"Rebuilt statistics for {read_report_stats(conn)['total']} reports")
+    conn.close()
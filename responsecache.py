@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_AGE = 60
+
+class CachedResponse:
+    def __init__(self, body, mimetype, version):
+        self.body = body
+        self.mimetype = mimetype
+        self.version = version
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.created_at = time.monotonic()
+
+class ResponseCache:
+    # Rendered pages keyed on route and query args. An entry is only served while the data version
+    # it was rendered under is still current; max_age bounds pages that depend on the clock
+    # (the current month, bans expiring soon). Least recently used entries go first past max_bytes.
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry.version != version or time.monotonic() - entry.created_at > self.max_age):
+                self.discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        entry = CachedResponse(body, mimetype, version)
+        if len(body) > self.max_bytes:
+            return entry
+        with self.lock:
+            # A write that landed while the page was rendering makes it stale before it is stored
+            if version[0] != self.generation:
+                return entry
+            self.discard(key)
+            self.entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return entry
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses, 'generation': self.generation}
@@ -0,0 +1,57 @@
+import argparse
+import os
+from app import create_app
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    # gunicorn isn't installed, or this is Windows, which it doesn't support
+    BaseApplication = None
+
+DEFAULT_PORT = 4200
+DEFAULT_THREADS = 8
+# Long enough for a full CSV export to stream before gunicorn treats a worker as hung
+WORKER_TIMEOUT = 120
+
+if BaseApplication is not None:
+    class GunicornServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Each worker runs create_app itself after forking, so no SQLite connection crosses a fork
+            return create_app()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the report database to several users at once.')
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SERVER_PORT', DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', 1)),
+                        help='worker processes (needs gunicorn)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVER_THREADS', DEFAULT_THREADS)),
+                        help='request threads per worker')
+    args = parser.parse_args()
+
+    if BaseApplication is None:
+        if args.workers > 1:
+            print('gunicorn is not available; serving with a single threaded worker.')
+        # Werkzeug's threaded server starts a thread per request, so --threads doesn't apply
+        create_app().run(host=args.host, port=args.port, debug=False, threaded=True)
+        return
+
+    GunicornServer({
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': WORKER_TIMEOUT,
+        'accesslog': None,
+    }).run()
+
+if __name__ == '__main__':
+    main()
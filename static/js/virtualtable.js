@@ -0,0 +1,212 @@
+// Renders a keyset-paginated JSON listing (/api/v1/...) into a fixed-height scrolling table.
+// Only the rows in view (plus a small overscan) exist in the DOM, and only the pages around the
+// viewport are kept in memory; evicted pages are fetched again from their cursor when scrolled back to.
+class VirtualTable {
+    constructor(options) {
+        this.container = options.container;
+        this.tbody = options.container.querySelector('tbody');
+        this.url = options.url;
+        this.params = options.params || {};
+        this.columns = options.columns;
+        this.pageSize = options.pageSize || 50;
+        this.maxPages = options.maxPages || 10;
+        this.overscan = options.overscan || 10;
+        this.rowHeight = options.rowHeight || 41;
+        this.onTotal = options.onTotal || function() {};
+        this.onError = options.onError || function(message) { console.error(message); };
+
+        // pages[i] = {cursor, rows}; rows is null until loaded or after eviction
+        this.pages = [{cursor: null, rows: null}];
+        this.done = false;
+        this.loading = {};
+        this.measured = false;
+        this.viewPage = 0;
+        this.renderQueued = false;
+
+        this.container.addEventListener('scroll', () => this.queueRender());
+        window.addEventListener('resize', () => this.queueRender());
+        this.loadPage(0);
+    }
+
+    // Row count the scrollbar covers: every page before the last is full
+    knownRows() {
+        const last = this.pages[this.pages.length - 1];
+        const lastRows = last.rows ? last.rows.length : 0;
+        return (this.pages.length - 1) * this.pageSize + lastRows;
+    }
+
+    loadPage(index) {
+        const page = this.pages[index];
+        if (!page || page.rows || this.loading[index]) {
+            return;
+        }
+        this.loading[index] = true;
+        const params = new URLSearchParams(this.params);
+        params.set('page_size', this.pageSize);
+        if (page.cursor) {
+            params.set('cursor', page.cursor);
+        }
+        fetch(this.url + '?' + params.toString(), {headers: {'Accept': 'application/json'}})
+            .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+            .then(result => {
+                delete this.loading[index];
+                if (!result.ok) {
+                    this.onError(result.data.error || 'Request failed');
+                    return;
+                }
+                const data = result.data;
+                page.rows = data.items;
+                if (data.total !== undefined) {
+                    this.onTotal(data.total);
+                }
+                if (index === this.pages.length - 1) {
+                    if (data.next_cursor) {
+                        this.pages.push({cursor: data.next_cursor, rows: null});
+                    } else {
+                        this.done = true;
+                    }
+                }
+                this.evict();
+                this.queueRender();
+            })
+            .catch(error => {
+                delete this.loading[index];
+                this.onError(error.message);
+            });
+    }
+
+    evict() {
+        // Drops the pages farthest from the viewport; the last page stays, since its length sets the scroll height
+        const lastIndex = this.pages.length - 1;
+        const loaded = [];
+        this.pages.forEach((page, index) => {
+            if (page.rows && index !== lastIndex) {
+                loaded.push(index);
+            }
+        });
+        loaded.sort((a, b) => Math.abs(b - this.viewPage) - Math.abs(a - this.viewPage));
+        while (loaded.length >= this.maxPages) {
+            this.pages[loaded.shift()].rows = null;
+        }
+    }
+
+    queueRender() {
+        if (!this.renderQueued) {
+            this.renderQueued = true;
+            window.requestAnimationFrame(() => {
+                this.renderQueued = false;
+                this.render();
+            });
+        }
+    }
+
+    spacer(height) {
+        const row = document.createElement('tr');
+        const cell = document.createElement('td');
+        cell.colSpan = this.columns.length;
+        cell.className = 'virtual-spacer';
+        cell.style.height = height + 'px';
+        row.appendChild(cell);
+        return row;
+    }
+
+    render() {
+        const total = this.knownRows();
+        const visible = Math.ceil(this.container.clientHeight / this.rowHeight);
+        const first = Math.max(0, Math.floor(this.container.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(total, first + visible + 2 * this.overscan);
+        this.viewPage = Math.floor(first / this.pageSize);
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(this.spacer(first * this.rowHeight));
+        for (let index = first; index < last; index++) {
+            const page = this.pages[Math.floor(index / this.pageSize)];
+            const row = page.rows ? page.rows[index % this.pageSize] : null;
+            fragment.appendChild(row ? this.renderRow(row) : this.placeholderRow());
+        }
+        fragment.appendChild(this.spacer((total - last) * this.rowHeight));
+        this.tbody.replaceChildren(fragment);
+
+        if (!this.measured && last > first) {
+            const rendered = this.tbody.children[1];
+            if (rendered && rendered.offsetHeight) {
+                this.measured = true;
+                if (rendered.offsetHeight !== this.rowHeight) {
+                    this.rowHeight = rendered.offsetHeight;
+                    this.queueRender();
+                }
+            }
+        }
+
+        // Fetch evicted pages in view, and the next page once the end is within a screen
+        for (let index = Math.floor(first / this.pageSize); index <= Math.floor(Math.max(first, last - 1) / this.pageSize); index++) {
+            this.loadPage(index);
+        }
+        if (!this.done && total - last < visible) {
+            this.loadPage(this.pages.length - 1);
+        }
+    }
+
+    renderRow(item) {
+        const row = document.createElement('tr');
+        this.columns.forEach(column => {
+            const cell = document.createElement('td');
+            const content = column(item);
+            if (content instanceof Node) {
+                cell.appendChild(content);
+            } else if (content !== null && content !== undefined) {
+                cell.textContent = content;
+            }
+            row.appendChild(cell);
+        });
+        return row;
+    }
+
+    placeholderRow() {
+        const row = document.createElement('tr');
+        const cell = document.createElement('td');
+        cell.colSpan = this.columns.length;
+        cell.textContent = 'Loading...';
+        row.appendChild(cell);
+        return row;
+    }
+}
+
+function evidenceButton(items, onOpen) {
+    const button = document.createElement('button');
+    button.textContent = 'View Evidence';
+    if (items && items.length) {
+        button.className = 'btn btn-info btn-sm';
+        button.dataset.bsToggle = 'modal';
+        button.dataset.bsTarget = '#evidenceModal';
+        button.addEventListener('click', () => onOpen(items));
+    } else {
+        button.className = 'btn btn-secondary btn-sm btn-disabled';
+        button.disabled = true;
+    }
+    return button;
+}
+
+const VIDEO_EXTENSIONS = ['mp4', 'm4v', 'webm', 'mov', 'ogv'];
+const IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg', 'gif', 'webp'];
+
+// Inline player for evidence the browser can show. The video element requests byte ranges as it
+// plays and seeks, so jumping into a long clip doesn't wait for the whole file.
+function evidencePreview(url, path) {
+    const extension = path.split('.').pop().toLowerCase();
+    let element;
+    if (VIDEO_EXTENSIONS.includes(extension)) {
+        element = document.createElement('video');
+        element.controls = true;
+        element.preload = 'metadata';
+    } else if (IMAGE_EXTENSIONS.includes(extension)) {
+        element = document.createElement('img');
+        element.loading = 'lazy';
+        element.alt = path;
+    } else {
+        return null;
+    }
+    element.className = 'evidence-preview mb-2';
+    element.src = url;
+    return element;
+}